@@ -0,0 +1,165 @@
+"""
+This module contains the AssetManager class, which loads images and sounds
+from disk once and hands out cached objects afterwards
+"""
+
+from typing import Iterable, Literal
+import pygame
+from rotation_atlas import RotationAtlas
+from variables import ROTATION_STEPS
+
+Conversion = Literal["alpha", "opaque"] | None
+
+
+class AssetManager:
+    """
+    Process-wide cache of images, converted surfaces and sounds, keyed by path
+    Returned objects are shared: callers must copy them before drawing onto them
+    """
+
+    images: dict[tuple, pygame.Surface]
+    sounds: dict[str, pygame.mixer.Sound]
+    atlases: dict[tuple, RotationAtlas]
+    hits: int
+    misses: int
+
+    def __init__(self):
+        self.images = {}
+        self.sounds = {}
+        self.atlases = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image(
+        self,
+        path: str,
+        convert: Conversion = "alpha",
+        size: tuple[int, int] | None = None,
+    ) -> pygame.Surface:
+        """
+        Returns the image at path, converted to the display format
+        ("alpha" for convert_alpha, "opaque" for convert, None to keep it as loaded)
+        If size is given, the image is scaled to it and only the scaled copy is kept
+        """
+        key = (path, convert, size)
+        surface = self.images.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        # Only the variant asked for is kept, not the image as loaded
+        surface = self.images.get((path, None, None))
+        if surface is None:
+            surface = pygame.image.load(path)
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+        surface = self.convert(surface, convert)
+
+        self.images[key] = surface
+        return surface
+
+    def subsurface(
+        self, path: str, rect: tuple[int, int, int, int], convert: Conversion = "alpha"
+    ) -> pygame.Surface:
+        """Returns a cached subsurface of the image at path"""
+        key = (path, convert, None, rect)
+        surface = self.images.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.image(path, convert).subsurface(pygame.Rect(rect))
+        self.images[key] = surface
+        return surface
+
+    def rotation_atlas(
+        self,
+        path: str,
+        rect: tuple[int, int, int, int] | None = None,
+        size: tuple[int, int] | None = None,
+        steps: int = ROTATION_STEPS,
+    ) -> RotationAtlas:
+        """
+        Returns a cached RotationAtlas of the image at path, optionally cropped
+        to rect and then scaled to size
+        """
+        key = (path, rect, size, steps)
+        atlas = self.atlases.get(key)
+        if atlas is not None:
+            self.hits += 1
+            return atlas
+
+        self.misses += 1
+        sprite = self.subsurface(path, rect) if rect else self.image(path)
+        if size is not None:
+            sprite = pygame.transform.scale(sprite, size)
+        atlas = RotationAtlas(sprite, steps)
+        self.atlases[key] = atlas
+        return atlas
+
+    def sound(self, path: str, volume: float | None = None) -> pygame.mixer.Sound:
+        """
+        Returns the sound at path
+        If volume is given, it is set on the shared sound, even if it was already loaded
+        """
+        sound = self.sounds.get(path)
+        if sound is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            sound = pygame.mixer.Sound(path)
+            self.sounds[path] = sound
+
+        if volume is not None:
+            sound.set_volume(volume)
+        return sound
+
+    def preload(
+        self,
+        images: Iterable[str] = (),
+        sounds: Iterable[str] = (),
+        convert: Conversion = "alpha",
+    ):
+        """Loads the given images and sounds ahead of time"""
+        for path in images:
+            self.image(path, convert)
+        for path in sounds:
+            self.sound(path)
+
+    @staticmethod
+    def convert(surface: pygame.Surface, convert: Conversion) -> pygame.Surface:
+        """
+        Converts a surface to the display format,
+        which only exists once the engine has started
+        """
+        if convert is not None and pygame.display.get_surface() is None:
+            raise pygame.error(
+                "Images can't be converted before the display is created, "
+                "call engine.start() first"
+            )
+        if convert == "alpha":
+            return surface.convert_alpha()
+        if convert == "opaque":
+            return surface.convert()
+        return surface
+
+    def stats(self):
+        """Returns cache hit/miss statistics"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "images": len(self.images),
+            "sounds": len(self.sounds),
+            "atlases": len(self.atlases),
+        }
+
+    def clear(self):
+        """Forget every cached asset"""
+        self.images.clear()
+        self.sounds.clear()
+        self.atlases.clear()
+
+
+assets = AssetManager()
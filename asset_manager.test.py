@@ -0,0 +1,64 @@
+"""Test the asset_manager module"""
+
+import unittest
+from asset_manager import AssetManager, assets
+from engine import engine, PRELOADED_SOUNDS
+
+LASER = "assets/sounds/laser.wav"
+AMMO = "assets/ammo/ammo.png"
+
+
+class TestSounds(unittest.TestCase):
+    """Test the sounds cached by the asset manager"""
+
+    @classmethod
+    def setUpClass(cls):
+        engine.start(headless=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        engine.stop()
+
+    def test_preloaded_volume(self):
+        """Test that the volume is applied to a sound loaded while starting"""
+        self.assertIn(LASER, PRELOADED_SOUNDS)
+        sound = assets.sound(LASER, volume=0.4)
+        self.assertIs(sound, assets.sounds[LASER])
+        self.assertAlmostEqual(sound.get_volume(), 0.4, places=2)
+
+    def test_volume_kept(self):
+        """Test that getting a sound without a volume leaves its volume alone"""
+        assets.sound(LASER, volume=0.4)
+        self.assertAlmostEqual(assets.sound(LASER).get_volume(), 0.4, places=2)
+
+
+class TestImages(unittest.TestCase):
+    """Test the images cached by the asset manager"""
+
+    @classmethod
+    def setUpClass(cls):
+        engine.start(headless=True, preload=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        engine.stop()
+
+    def test_converted_only(self):
+        """Test that converting an image only keeps the converted variant"""
+        manager = AssetManager()
+        surface = manager.image(AMMO, "opaque")
+        self.assertEqual(list(manager.images), [(AMMO, "opaque", None)])
+        self.assertEqual(manager.stats()["misses"], 1)
+        self.assertIs(manager.image(AMMO, "opaque"), surface)
+        self.assertEqual(manager.stats()["hits"], 1)
+
+    def test_scaled_only(self):
+        """Test that scaling an image only keeps the scaled variant"""
+        manager = AssetManager()
+        surface = manager.image(AMMO, "alpha", size=(8, 8))
+        self.assertEqual(surface.get_size(), (8, 8))
+        self.assertEqual(list(manager.images), [(AMMO, "alpha", (8, 8))])
+
+
+if __name__ == "__main__":
+    unittest.main()
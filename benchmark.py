@@ -0,0 +1,293 @@
+"""
+This module benchmarks the game without opening a window, by playing scripted
+scenarios and reporting frame time percentiles of the render and update paths
+Run it with `python benchmark.py [scenario ...]`, see `--help` for the options
+"""
+
+import argparse
+import json
+import os
+import sys
+import pygame
+from chunks import Chunk
+from controls import Action, InputHandler
+from engine import engine
+from game import Game
+from pos import Vector2, Rotation
+from profiler import profiler
+from stars import StarfieldRenderer
+from tile_types import TileRegistry
+from ui import LINES_FRAME_COUNT, FontRenderer
+from variables import CHUNK_SIZE, RESOLUTION, GameStates
+
+FRAMES = 300
+BASELINE = "benchmark_baseline.json"
+# A timing is a regression when its p50 is this much slower than the baseline
+TOLERANCE = 0.25
+# and at least this much slower (in ms), as shorter timings are mostly noise
+MIN_REGRESSION = 0.05
+
+# Timings reported for every scenario, and the code they measure
+TIMINGS = {
+    "level.render": "Level.render",
+    "update.entities": "Level.update_all",
+    "render.ui": "UI.render",
+    "font": "FontRenderer.render",
+    "stars": "StarfieldRenderer.render",
+}
+
+
+class ScriptedInput(InputHandler):
+    """Input that holds the same actions every tick, instead of reading the keyboard"""
+
+    script: set[Action]
+
+    def __init__(self, held: set[Action]):
+        super().__init__()
+        self.script = held
+
+    def sample(self):
+        self.held = set(self.script)
+        self.pressed = list(self.queue)
+        self.queue.clear()
+
+
+def make_game(screen: pygame.Surface, held: set[Action] = frozenset()):
+    """Returns a new game, played with the given actions held down"""
+    game = Game(screen)
+    game.input = ScriptedInput(held)
+    return game
+
+
+def play(game: Game, frames: int = FRAMES, before_tick=None):
+    """
+    Run one tick and render one frame, frames times
+    before_tick is called with the game before every tick, to script the scenario
+    """
+    for _ in range(frames):
+        if before_tick is not None:
+            before_tick(game)
+        game.tick()
+        with profiler.scope("level.render"):
+            game.render(0.5)
+        for name, value in game.level.render_stats.items():
+            profiler.count(name, value)
+        profiler.end_frame()
+
+
+def benchmark_idle(screen: pygame.Surface):
+    """The player floating in empty space"""
+    play(make_game(screen))
+
+
+def benchmark_bullets(screen: pygame.Surface, per_tick: int = 10):
+    """
+    Thousands of bullets, shot with Player.shoot in every direction,
+    per_tick of them every tick
+    """
+    step = Rotation.from_degrees(360 / per_tick + 1)
+
+    def shoot(game: Game):
+        player = game.level.players[0]
+        for _ in range(per_tick):
+            player.shoot(game.level.bullets)
+            player.coords.rotation.iadd(step)
+
+    play(make_game(screen, {Action.SHOOT}), before_tick=shoot)
+
+
+def benchmark_rotation(screen: pygame.Surface, cruise: float = 4.5):
+    """
+    The player turning and braking, with the speed lines overlay showing:
+    faded to an intermediate opacity for the first half of the run, while the
+    velocity is held around cruise, then at full speed
+    """
+    game = make_game(screen)
+    overlay = game.level.ui.lines_overlay
+    opacities = []
+
+    def steer(game: Game):
+        player = game.level.players[0]
+        # The lines only show at positive velocities, which braking reaches
+        # Turning keeps the throttle on, so the velocity holds between brakes
+        game.input.script = {Action.TURN_LEFT}
+        if game.tick_count >= FRAMES // 2 or player.velocity < cruise:
+            game.input.script.add(Action.BRAKE)
+        opacities.append(overlay.opacity(player.velocity))
+
+    # Measure the fading, not the first decoding of the frames
+    for frame in range(LINES_FRAME_COUNT):
+        overlay.get_sprite(frame)
+    play(game, before_tick=steer)
+    assert game.level.ui.overlay_drawn
+    assert any(0 < opacity < overlay.max_opacity for opacity in opacities)
+
+
+def benchmark_menu(screen: pygame.Surface):
+    """The pause menu open"""
+    game = make_game(screen)
+    game.input.queue.append((Action.TOGGLE_MENU, None))
+    play(game)
+    assert game.state == GameStates.MENU
+
+
+def benchmark_tiles(screen: pygame.Surface):
+    """Flying at full speed over an autotiled map, generated as chunks load"""
+    grass, earth, water = (
+        TileRegistry["base:grass"].id,
+        TileRegistry["base:earth"].id,
+        TileRegistry["base:water"].id,
+    )
+
+    def generate(chunk: Chunk):
+        origin_x, origin_y = chunk.origin
+        for x in range(CHUNK_SIZE):
+            for y in range(CHUNK_SIZE):
+                pattern = ((origin_x + x) // 5 + (origin_y + y) // 7) % 4
+                chunk.set(
+                    x, y, water if pattern == 0 else earth if pattern == 1 else grass
+                )
+
+    centers = set()
+
+    def track(game: Game):
+        centers.add(game.level.tiles.center)
+
+    game = make_game(screen, {Action.THRUST})
+    game.level.tiles.generator = generate
+    play(game, before_tick=track)
+    # The chunk the camera is in changed, past the first tick
+    assert len(centers - {None}) > 1
+
+
+def benchmark_font(screen: pygame.Surface):
+    """Text that changes every frame, mixed with text that doesn't"""
+    for frame in range(FRAMES):
+        with profiler.scope("font"):
+            for line in (
+                "resume",
+                "save",
+                "quit",
+                f"frame {frame}",
+                f"{frame % 60} fps",
+            ):
+                screen.blit(FontRenderer(line).render(), (0, 0))
+        profiler.end_frame()
+
+
+def benchmark_starfield(screen: pygame.Surface, procedural: bool = False):
+    """The starfield alone, with the camera moving diagonally across texture edges"""
+    starfield = StarfieldRenderer(0, procedural=procedural)
+    for frame in range(FRAMES):
+        screen.fill((0, 0, 0))
+        with profiler.scope("stars"):
+            starfield.render(screen, Vector2(frame * 7.3, frame * 3.1))
+        profiler.count("blits", starfield.blits)
+        profiler.end_frame()
+
+
+def benchmark_procedural_starfield(screen: pygame.Surface):
+    """The procedural starfield, along the same path as the tiled one"""
+    benchmark_starfield(screen, procedural=True)
+
+
+SCENARIOS = {
+    "idle": benchmark_idle,
+    "bullets": benchmark_bullets,
+    "rotation": benchmark_rotation,
+    "menu": benchmark_menu,
+    "tiles": benchmark_tiles,
+    "font": benchmark_font,
+    "starfield": benchmark_starfield,
+    "procedural_starfield": benchmark_procedural_starfield,
+}
+
+
+def run(screen: pygame.Surface, name: str):
+    """
+    Run a scenario, and returns the p50, p95 and p99 (in ms) of the timings it
+    recorded, and the p50 of its counters
+    """
+    profiler.reset()
+    SCENARIOS[name](screen)
+    results = {}
+    for metric, (p50, p95, p99) in profiler.summary().items():
+        if metric in TIMINGS:
+            results[metric] = {"p50": p50, "p95": p95, "p99": p99}
+        elif metric not in profiler.timing_names:
+            results[metric] = {"p50": p50}
+    return results
+
+
+def compare(results: dict, baseline: dict):
+    """Returns a description of every timing whose p50 regressed from the baseline"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, values in metrics.items():
+            reference = baseline.get(name, {}).get(metric, {}).get("p50")
+            if (
+                metric in TIMINGS
+                and reference
+                and values["p50"] > reference * (1 + TOLERANCE)
+                and values["p50"] - reference > MIN_REGRESSION
+            ):
+                regressions.append(
+                    f"{name} {TIMINGS[metric]}: p50 {values['p50']:.3f} ms, "
+                    f"baseline {reference:.3f} ms"
+                )
+    return regressions
+
+
+def main():
+    """Run the benchmarks, and compare them with the baseline"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument(
+        "scenarios", nargs="*", help=f"scenarios to run: {', '.join(SCENARIOS)}"
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"write the results to {BASELINE} instead of comparing with it",
+    )
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file")
+    args = parser.parse_args()
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}")
+
+    screen = engine.start(RESOLUTION, headless=True)
+
+    results = {}
+    for name in args.scenarios if args.scenarios else SCENARIOS:
+        results[name] = run(screen, name)
+        print(name)
+        for metric, values in results[name].items():
+            label = TIMINGS.get(metric, metric)
+            print(
+                f"  {label:<26}"
+                + "  ".join(f"{key} {value:8.3f}" for key, value in values.items())
+            )
+    engine.stop()
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        regressions = compare(results, json.load(file))
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
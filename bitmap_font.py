@@ -0,0 +1,118 @@
+"""
+This module contains the BitmapFont class, which packs the font sprites into
+a single atlas and caches rendered strings
+"""
+
+from collections import OrderedDict
+from functools import cache
+import os
+import re
+import pygame
+from asset_manager import assets
+from variables import UI_ZOOM, TEXT_CACHE_SIZE
+
+# Matches "font_a.png", and the "font_!.png.png" typo, but not copies like "font_, (1).png"
+GLYPH_FILE = re.compile(r"^font_(.)(\.png)+$")
+SPACE_WIDTH = 4
+
+
+class BitmapFont:
+    """
+    A variable width bitmap font, with every glyph packed in one atlas surface
+    Rendered strings are kept in an LRU cache keyed by (text, zoom, color)
+    """
+
+    atlas: pygame.Surface
+    glyphs: dict[str, pygame.Rect]  # Area of each character in the atlas
+    height: int
+    cache: OrderedDict[tuple, pygame.Surface]
+    cache_size: int
+    hits: int
+    misses: int
+
+    def __init__(
+        self, directory: str = "assets/font", cache_size: int = TEXT_CACHE_SIZE
+    ):
+        images = {}
+        for filename in sorted(os.listdir(directory)):
+            match = GLYPH_FILE.match(filename)
+            if match:
+                images[match.group(1)] = assets.image(
+                    os.path.join(directory, filename), None
+                )
+
+        self.height = max(image.get_height() for image in images.values())
+        self.atlas = pygame.Surface(
+            (sum(image.get_width() for image in images.values()), self.height),
+            pygame.SRCALPHA,
+        )
+        self.glyphs = {}
+        x = 0
+        for char, image in images.items():
+            self.atlas.blit(image, (x, 0))
+            self.glyphs[char] = pygame.Rect(x, 0, image.get_width(), image.get_height())
+            x += image.get_width()
+
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def layout(self, text: str, zoom: float = UI_ZOOM):
+        """
+        Returns the position of each glyph of text (lowercased) and the total width,
+        at zoom 1, with kerning -1
+        Spaces are SPACE_WIDTH * zoom wide, characters without a glyph are skipped
+        """
+        placed = []
+        x = 0
+        for char in text.lower():
+            if char == " ":
+                x += SPACE_WIDTH * zoom
+                continue
+            glyph = self.glyphs.get(char)
+            if glyph is None:
+                continue
+            placed.append((glyph, x))
+            x += glyph.width - 1
+        return placed, x + 1
+
+    def render(
+        self,
+        text: str,
+        zoom: float = UI_ZOOM,
+        color: tuple[int, int, int] | None = None,
+    ) -> pygame.Surface:
+        """
+        Returns text rendered with the font, scaled by zoom and tinted with color
+        The surface is shared with later calls: copy it before drawing on it
+        """
+        key = (text, zoom, color)
+        surface = self.cache.get(key)
+        if surface is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        placed, width = self.layout(text, zoom)
+        surface = pygame.Surface((max(int(width), 1), self.height), pygame.SRCALPHA)
+        surface.blits([(self.atlas, (x, 0), glyph) for glyph, x in placed], False)
+
+        surface = pygame.transform.scale(
+            surface,
+            (int(surface.get_width() * zoom), int(surface.get_height() * zoom)),
+        )
+        if color is not None:
+            surface.fill(color, special_flags=pygame.BLEND_RGB_MULT)
+
+        self.cache[key] = surface
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return surface
+
+
+@cache
+def default_font():
+    """Returns the game font, loading it the first time"""
+    return BitmapFont()
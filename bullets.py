@@ -0,0 +1,160 @@
+"""
+This module contains the BulletPool class, which simulates and renders every
+bullet in the level as contiguous NumPy arrays instead of one object per bullet
+"""
+
+import numpy as np
+import pygame
+from asset_manager import assets
+from pos import Vector2, Vector2Array, Rotation
+from rotation_atlas import RotationAtlas
+from variables import TICK_RATE, ZOOM
+
+BULLET_SPEED = -1.1  # Added to the velocity of the shooter, in tiles per tick
+BULLET_LIFETIME = 5  # In seconds
+BULLET_SIZE = (3, 8)
+
+
+class BulletPool:
+    """
+    Struct-of-arrays storage for bullets: the first `count` entries of each
+    array are live bullets, which move in a straight line until they expire
+    """
+
+    count: int
+    tick: int  # Ticks simulated since the pool was created
+    pos: Vector2Array
+    previous_pos: Vector2Array  # Positions before the last tick, for interpolation
+    velocity: Vector2Array  # Movement per tick
+    frame: np.ndarray  # Index of the pre-rotated sprite in the atlas
+    spawn_tick: np.ndarray
+    atlas: RotationAtlas
+    half_widths: np.ndarray  # Half size of each atlas frame, to center sprites
+    half_heights: np.ndarray
+
+    def __init__(self, capacity: int = 1024):
+        self.count = 0
+        self.tick = 0
+        self.pos = Vector2Array.zeros(capacity)
+        self.previous_pos = Vector2Array.zeros(capacity)
+        self.velocity = Vector2Array.zeros(capacity)
+        self.frame = np.zeros(capacity, dtype=np.int32)
+        self.spawn_tick = np.zeros(capacity, dtype=np.int64)
+
+        # Image is a small red rectangle with a bullet trail
+        self.atlas = assets.rotation_atlas("assets/ammo/ammo.png", size=BULLET_SIZE)
+        self.half_widths = np.array(
+            [frame.get_width() / 2 for frame in self.atlas.frames]
+        )
+        self.half_heights = np.array(
+            [frame.get_height() / 2 for frame in self.atlas.frames]
+        )
+
+    @property
+    def capacity(self):
+        """Number of bullets that fit in the arrays before they have to grow"""
+        return len(self.frame)
+
+    def grow(self):
+        """Double the size of every array"""
+
+        def grown(array: np.ndarray):
+            result = np.zeros((len(array) * 2, *array.shape[1:]), dtype=array.dtype)
+            result[: self.count] = array[: self.count]
+            return result
+
+        for vectors in (self.pos, self.previous_pos, self.velocity):
+            vectors.data = grown(vectors.data)
+        self.frame = grown(self.frame)
+        self.spawn_tick = grown(self.spawn_tick)
+
+    def spawn(self, pos: Vector2, rotation: Rotation, velocity: float):
+        """Shoot a bullet from pos, in the direction of rotation"""
+        if self.count == self.capacity:
+            self.grow()
+
+        i = self.count
+        speed = velocity + BULLET_SPEED
+        self.pos[i] = pos
+        self.previous_pos[i] = pos
+        # Forward vector of the rotation, scaled by the speed
+        self.velocity[i] = (rotation.sin * speed, rotation.cos * speed)
+        self.frame[i] = self.atlas.index(rotation)
+        self.spawn_tick[i] = self.tick
+        self.count += 1
+
+    def update(self):
+        """Expire old bullets, then move the others forward by one tick"""
+        self.tick += 1
+        n = self.count
+
+        alive = self.tick - self.spawn_tick[:n] <= BULLET_LIFETIME * TICK_RATE
+        if not alive.all():
+            # Keep live bullets packed at the start of the arrays
+            n = int(np.count_nonzero(alive))
+            for array in (
+                self.pos.data,
+                self.velocity.data,
+                self.frame,
+                self.spawn_tick,
+            ):
+                array[:n] = array[: self.count][alive]
+            self.count = n
+
+        self.previous_pos[:n].assign(self.pos[:n])
+        self.pos[:n].iadd(self.velocity[:n])
+
+    def render(
+        self,
+        final_render: pygame.Surface,
+        camera_position: Vector2,
+        alpha: float,
+        rects: list[pygame.Rect] | None = None,
+    ):
+        """
+        Blit the bullets that are on screen, and return how many were drawn
+        If rects is given, the area covered by each bullet is appended to it
+        """
+        n = self.count
+        if n == 0:
+            return 0
+
+        width = final_render.get_width()
+        height = final_render.get_height()
+        pixels_per_tile = 16 * ZOOM
+
+        # Screen position of the center of each bullet, interpolated between ticks
+        previous_pos = self.previous_pos[:n]
+        center = previous_pos + (self.pos[:n] - previous_pos) * alpha - camera_position
+        center.imul(pixels_per_tile).iadd(Vector2(width / 2, height / 2))
+        center_x = center.x
+        center_y = center.y
+
+        frame = self.frame[:n]
+        left = center_x - self.half_widths[frame]
+        top = center_y - self.half_heights[frame]
+        visible = np.nonzero(
+            (left < width)
+            & (top < height)
+            & (center_x + self.half_widths[frame] > 0)
+            & (center_y + self.half_heights[frame] > 0)
+        )[0]
+
+        frames = self.atlas.frames
+        drawn = final_render.blits(
+            [
+                (frames[f], (x, y))
+                for f, x, y in zip(
+                    frame[visible].tolist(),
+                    left[visible].tolist(),
+                    top[visible].tolist(),
+                )
+            ],
+            doreturn=rects is not None,
+        )
+        if rects is not None:
+            rects.extend(drawn)
+        return len(visible)
+
+    def __len__(self):
+        return self.count
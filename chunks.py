@@ -0,0 +1,162 @@
+"""
+This module contains the Chunk and ChunkStore classes, which store an unbounded
+tile map as fixed size chunks of tile IDs, loaded around the camera on demand
+"""
+
+from array import array
+from typing import Callable, Iterator
+import math
+import zlib
+from pos import Vector2
+from variables import CHUNK_SIZE, CHUNK_LOAD_RADIUS, CHUNK_UNLOAD_RADIUS
+
+EMPTY_TILE = 0  # Tile ID of cells without a tile
+
+
+class Chunk:
+    """
+    A CHUNK_SIZE x CHUNK_SIZE square of the map, stored as one byte per cell
+    Each byte is a tile ID, EMPTY_TILE for cells without a tile
+    """
+
+    position: tuple[int, int]  # In chunks, not tiles
+    tiles: array
+    modified: bool  # Whether the tiles differ from what the generator made
+
+    def __init__(self, position: tuple[int, int], tiles: array | None = None):
+        self.position = position
+        self.tiles = tiles if tiles else array("B", bytes(CHUNK_SIZE * CHUNK_SIZE))
+        self.modified = False
+
+    @property
+    def origin(self):
+        """Position (in tiles) of the top left cell of the chunk"""
+        return (self.position[0] * CHUNK_SIZE, self.position[1] * CHUNK_SIZE)
+
+    def get(self, x: int, y: int) -> int:
+        """Returns the tile ID at the given position, relative to the chunk"""
+        return self.tiles[x + y * CHUNK_SIZE]
+
+    def set(self, x: int, y: int, tile_id: int):
+        """Sets the tile ID at the given position, relative to the chunk"""
+        self.tiles[x + y * CHUNK_SIZE] = tile_id
+        self.modified = True
+
+    def is_empty(self):
+        """Whether no cell of the chunk has a tile"""
+        return not any(self.tiles)
+
+    def to_bytes(self) -> bytes:
+        """Returns the tiles of the chunk, compressed"""
+        return zlib.compress(self.tiles.tobytes())
+
+    @classmethod
+    def from_bytes(cls, position: tuple[int, int], data: bytes):
+        """Returns a chunk made from the output of to_bytes"""
+        chunk = cls(position, array("B", zlib.decompress(data)))
+        chunk.modified = True
+        return chunk
+
+
+# Fills in the tiles of a freshly created chunk
+ChunkGenerator = Callable[[Chunk], None]
+
+
+class ChunkStore:
+    """
+    Tile map made of chunks, created the first time they are accessed
+    Chunks far from the camera are evicted, so memory doesn't grow with the
+    explored area: unmodified chunks are generated again when they come back,
+    modified ones are kept compressed until then
+    """
+
+    chunks: dict[tuple[int, int], Chunk]  # Loaded chunks
+    saved: dict[tuple[int, int], bytes]  # Evicted chunks that were modified
+    generator: ChunkGenerator | None  # Chunks are left empty without one
+    center: tuple[int, int] | None  # Chunk the camera was in on the last update
+
+    def __init__(self, generator: ChunkGenerator | None = None):
+        self.chunks = {}
+        self.saved = {}
+        self.generator = generator
+        self.center = None
+
+    @staticmethod
+    def chunk_of(x: int, y: int) -> tuple[int, int]:
+        """Returns the position of the chunk containing the given tile"""
+        return (x // CHUNK_SIZE, y // CHUNK_SIZE)
+
+    def get_chunk(self, position: tuple[int, int]) -> Chunk:
+        """Returns the chunk at position (in chunks), loading it if needed"""
+        chunk = self.chunks.get(position)
+        if chunk is not None:
+            return chunk
+
+        data = self.saved.pop(position, None)
+        if data is not None:
+            chunk = Chunk.from_bytes(position, data)
+        else:
+            chunk = Chunk(position)
+            if self.generator is not None:
+                self.generator(chunk)
+                chunk.modified = False
+        self.chunks[position] = chunk
+        return chunk
+
+    def get_tile(self, x: int, y: int) -> int:
+        """Returns the tile ID at the given position (in tiles)"""
+        chunk = self.get_chunk(self.chunk_of(x, y))
+        return chunk.get(x % CHUNK_SIZE, y % CHUNK_SIZE)
+
+    def set_tile(self, x: int, y: int, tile_id: int):
+        """Sets the tile ID at the given position (in tiles)"""
+        chunk = self.get_chunk(self.chunk_of(x, y))
+        chunk.set(x % CHUNK_SIZE, y % CHUNK_SIZE, tile_id)
+
+    def update(self, camera_position: Vector2):
+        """
+        Load the chunks within CHUNK_LOAD_RADIUS of the camera, and evict those
+        further than CHUNK_UNLOAD_RADIUS
+        """
+        center = self.chunk_of(
+            math.floor(camera_position.x), math.floor(camera_position.y)
+        )
+        # Nothing to do while the camera stays in the same chunk, unless chunks
+        # further away were loaded by tile accesses
+        if (
+            center == self.center
+            and len(self.chunks) <= (2 * CHUNK_UNLOAD_RADIUS + 1) ** 2
+        ):
+            return
+        self.center = center
+
+        for x in range(
+            center[0] - CHUNK_LOAD_RADIUS, center[0] + CHUNK_LOAD_RADIUS + 1
+        ):
+            for y in range(
+                center[1] - CHUNK_LOAD_RADIUS, center[1] + CHUNK_LOAD_RADIUS + 1
+            ):
+                self.get_chunk((x, y))
+
+        for position in [
+            position
+            for position in self.chunks
+            if max(abs(position[0] - center[0]), abs(position[1] - center[1]))
+            > CHUNK_UNLOAD_RADIUS
+        ]:
+            self.evict(position)
+
+    def evict(self, position: tuple[int, int]):
+        """Unload a chunk, keeping its tiles if they were modified"""
+        chunk = self.chunks.pop(position)
+        if chunk.modified:
+            if chunk.is_empty() and self.generator is None:
+                # Same as a freshly created chunk
+                return
+            self.saved[position] = chunk.to_bytes()
+
+    def __iter__(self) -> Iterator[Chunk]:
+        return iter(self.chunks.values())
+
+    def __len__(self):
+        return len(self.chunks)
@@ -0,0 +1,127 @@
+"""
+This module contains the InputHandler class, which turns keyboard and mouse input into
+game actions, sampled once per simulation tick on the main thread
+"""
+
+from collections import deque
+from enum import Enum
+import pygame
+from pygame.constants import (
+    K_UP,
+    K_DOWN,
+    K_LEFT,
+    K_RIGHT,
+    K_1,
+    K_2,
+    K_3,
+    K_4,
+    K_5,
+    K_6,
+    K_7,
+    K_8,
+    K_s,
+    K_l,
+    K_e,
+    K_ESCAPE,
+    K_F3,
+    K_F4,
+    K_SPACE,
+    KEYDOWN,
+    MOUSEBUTTONDOWN,
+    BUTTON_LEFT,
+    BUTTON_RIGHT,
+)
+
+
+class Action(Enum):
+    """Something the player can do with the keyboard"""
+
+    THRUST = 0
+    BRAKE = 1
+    TURN_LEFT = 2
+    TURN_RIGHT = 3
+    SHOOT = 4
+    SAVE = 5
+    LOAD = 6
+    SELECT_TILE = 7
+    TOGGLE_MENU = 8
+    TOGGLE_EDIT = 9
+    PLACE_TILE = 10
+    REMOVE_TILE = 11
+    TOGGLE_PROFILER = 12
+    DUMP_PROFILE = 13
+
+
+# Actions that are active for as long as their key is held down
+HELD_BINDINGS: dict[int, Action] = {
+    K_UP: Action.THRUST,
+    K_DOWN: Action.BRAKE,
+    K_LEFT: Action.TURN_LEFT,
+    K_RIGHT: Action.TURN_RIGHT,
+    K_SPACE: Action.SHOOT,
+}
+
+# Actions that trigger once when their key is pressed, with an optional argument
+PRESS_BINDINGS: dict[int, tuple[Action, int | None]] = {
+    K_s: (Action.SAVE, None),
+    K_l: (Action.LOAD, None),
+    K_ESCAPE: (Action.TOGGLE_MENU, None),
+    K_e: (Action.TOGGLE_EDIT, None),
+    K_F3: (Action.TOGGLE_PROFILER, None),
+    K_F4: (Action.DUMP_PROFILE, None),
+    K_1: (Action.SELECT_TILE, 0),
+    K_2: (Action.SELECT_TILE, 1),
+    K_3: (Action.SELECT_TILE, 2),
+    K_4: (Action.SELECT_TILE, 3),
+    K_5: (Action.SELECT_TILE, 4),
+    K_6: (Action.SELECT_TILE, 5),
+    K_7: (Action.SELECT_TILE, 6),
+    K_8: (Action.SELECT_TILE, 7),
+}
+
+# Actions that trigger once when a mouse button is pressed
+CLICK_BINDINGS: dict[int, Action] = {
+    BUTTON_LEFT: Action.PLACE_TILE,
+    BUTTON_RIGHT: Action.REMOVE_TILE,
+}
+
+
+class InputHandler:
+    """
+    Queues key presses and clicks as they arrive from the event loop and samples held keys,
+    so the simulation sees one consistent snapshot of the input per tick
+    """
+
+    held_bindings: dict[int, Action]
+    press_bindings: dict[int, tuple[Action, int | None]]
+    click_bindings: dict[int, Action]
+    queue: deque[tuple[Action, int | None]]
+    held: set[Action]  # Actions held down during the current tick
+    pressed: list[tuple[Action, int | None]]  # Actions pressed since the last tick
+
+    def __init__(
+        self,
+        held_bindings: dict[int, Action] | None = None,
+        press_bindings: dict[int, tuple[Action, int | None]] | None = None,
+        click_bindings: dict[int, Action] | None = None,
+    ):
+        self.held_bindings = held_bindings if held_bindings else HELD_BINDINGS
+        self.press_bindings = press_bindings if press_bindings else PRESS_BINDINGS
+        self.click_bindings = click_bindings if click_bindings else CLICK_BINDINGS
+        self.queue = deque()
+        self.held = set()
+        self.pressed = []
+
+    def handle_event(self, event: pygame.event.Event):
+        """Queue the action bound to a key press or mouse click event, if any"""
+        if event.type == KEYDOWN and event.key in self.press_bindings:
+            self.queue.append(self.press_bindings[event.key])
+        elif event.type == MOUSEBUTTONDOWN and event.button in self.click_bindings:
+            self.queue.append((self.click_bindings[event.button], None))
+
+    def sample(self):
+        """Take the input snapshot for the next simulation tick"""
+        keys = pygame.key.get_pressed()
+        self.held = {action for key, action in self.held_bindings.items() if keys[key]}
+        self.pressed = list(self.queue)
+        self.queue.clear()
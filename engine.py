@@ -0,0 +1,79 @@
+"""
+This module contains the Engine class, which initializes pygame's display,
+the mixer and the shared assets once, in that order, before the game starts
+Other modules have no side effects when imported, so nothing that needs the
+display (converting images, creating a Level) may run before Engine.start
+"""
+
+import os
+import pygame
+from asset_manager import assets
+from bitmap_font import default_font
+from stars import STARFIELD_LAYERS
+from variables import RESOLUTION
+
+CAPTION = "The Game"
+
+# Loaded while starting, as nearly every game needs them
+PRELOADED_IMAGES = [
+    "assets/Overworld.png",
+    "assets/ammo/ammo.png",
+    "assets/spaceship/greenships.png",
+]
+PRELOADED_SOUNDS = ["assets/sounds/laser.wav"]
+
+
+class Engine:
+    """Owns the display surface, created the first time the engine starts"""
+
+    screen: pygame.Surface | None
+    headless: bool
+
+    def __init__(self):
+        self.screen = None
+        self.headless = False
+
+    def start(
+        self,
+        resolution: tuple[int, int] = RESOLUTION,
+        headless: bool = False,
+        preload: bool = True,
+    ) -> pygame.Surface:
+        """
+        Initialize the display, then the mixer, then the assets, and returns the screen
+        headless uses SDL's dummy drivers, for tests and benchmarks
+        Starting again returns the existing screen
+        """
+        if self.screen is not None:
+            return self.screen
+
+        self.headless = headless
+        if headless:
+            # Must be set before SDL initializes the video and audio subsystems
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+        pygame.display.init()
+        self.screen = pygame.display.set_mode(resolution)
+        pygame.display.set_caption(CAPTION)
+
+        pygame.mixer.init()
+
+        if preload:
+            assets.preload(images=PRELOADED_IMAGES, sounds=PRELOADED_SOUNDS)
+            # The starfield layers draw their textures without alpha
+            assets.preload(
+                images=[path for path, _ in STARFIELD_LAYERS], convert="opaque"
+            )
+            default_font()
+        return self.screen
+
+    def stop(self):
+        """Close the display and the mixer, forgetting the assets tied to them"""
+        assets.clear()
+        default_font.cache_clear()
+        pygame.quit()
+        self.screen = None
+
+
+engine = Engine()
@@ -9,26 +9,37 @@ This file contains the Entity class, which represents an object
 that can be rendered on the screen
 """
 
+from __future__ import annotations
+from typing import TYPE_CHECKING
 import pygame
+from asset_manager import assets
+from bullets import BulletPool
 from pos import Coords, Vector2
+from rotation_atlas import RotationAtlas
 from variables import MAX_PLAYER_VELOCITY
 
+if TYPE_CHECKING:
+    from entity_pool import EntityPool
+
 
 class Entity(pygame.sprite.Sprite):
     """An entity is an object that can be rendered on the screen"""
 
     coords: Coords
+    previous_pos: Vector2  # Position before the last simulation tick
     velocity: float
     size: Vector2
     image: pygame.Surface
     rect: pygame.Rect
     dead: bool
+    pool: EntityPool | None  # The pool this entity goes back to when it dies
 
     def __init__(
         self, coords: Coords, size: Vector2, velocity: Vector2 = Vector2(0, 0)
     ):
         super().__init__()
         self.coords = coords
+        self.previous_pos = coords.pos.copy()
         self.size = size
         self.velocity = velocity.x
         self.image = pygame.Surface(size.to_int_tuple())
@@ -36,16 +47,31 @@ class Entity(pygame.sprite.Sprite):
         self.rect.x = coords.pos.x
         self.rect.y = coords.pos.y
         self.dead = False
+        self.pool = None
+
+    def reset(self, *args, **kwargs):
+        """
+        Reinitialize a recycled entity, taking the same arguments as its constructor
+        Runs the constructor again by default, so that subclass state is reset too
+        Subclasses can override this to reuse what their constructor allocates
+        """
+        type(self).__init__(self, *args, **kwargs)
 
     def update(self):
-        """Called every frame, at 60 frames a second"""
+        """Called every simulation tick"""
         self.rect.x = self.coords.pos.x
         self.rect.y = self.coords.pos.y
 
+    def interpolated_pos(self, alpha: float):
+        """
+        Get the position to render at, alpha being the fraction of a tick
+        elapsed since the last update (0 is the previous position, 1 the current one)
+        """
+        return self.previous_pos + (self.coords.pos - self.previous_pos) * alpha
+
     def render(self):
         """Render the entity on the screen"""
-        surface = pygame.Surface(self.size.to_int_tuple())
-        surface.blit(self.image, (0, 0))
+        return self.image
 
     def move(self, pos: Vector2):
         """Move the entity by the given position"""
@@ -59,23 +85,25 @@ class Player(Entity):
     frame: int
     timer: int
     sprites: list[pygame.Surface]
+    atlas: RotationAtlas
 
     def __init__(self, coords: Coords):
         super().__init__(coords, Vector2(43, 47))
 
         # Load animation sprites from a single image of 16x32 sprites stitched together
-        spritesheet = pygame.image.load(
-            "assets/spaceship/greenships.png"
-        ).convert_alpha()
+        spritesheet = assets.image("assets/spaceship/greenships.png")
         self.sprites = [spritesheet.subsurface(pygame.Rect(0, 0, 43, 47))]
 
         self.image = self.sprites[0]
+        self.atlas = assets.rotation_atlas(
+            "assets/spaceship/greenships.png", rect=(0, 0, 43, 47)
+        )
         self.frame = 0
         self.timer = 0
         self.throttle_on = False
 
-    def shoot(self):
-        """Shoot a bullet"""
+    def shoot(self, bullets: BulletPool):
+        """Shoot a bullet into the given pool"""
         OFFSET_RIGHT = 10
         # OFFSET_LEFT = 6
 
@@ -83,17 +111,13 @@ class Player(Entity):
         # left_side_pos = self.coords.pos  # + self.coords.left() * OFFSET_LEFT
 
         # Play shooting sound
-        sound = pygame.mixer.Sound("assets/sounds/laser.wav")
-        sound.set_volume(0.4)
-        sound.play()
+        assets.sound("assets/sounds/laser.wav", volume=0.4).play()
 
-        return [
-            Bullet(Coords(right_side_pos, self.coords.rotation), self.velocity),
-            # Bullet(Coords(left_side_pos, self.coords.rotation)),
-        ]
+        bullets.spawn(right_side_pos, self.coords.rotation, self.velocity)
+        # bullets.spawn(left_side_pos, self.coords.rotation, self.velocity)
 
     def update(self):
-        """Called every frame, at 60 frames a second"""
+        """Called every simulation tick"""
         # Clamp velocity
         # self.velocity.x = max(
         #    -MAX_PLAYER_VELOCITY, min(MAX_PLAYER_VELOCITY, self.velocity.x)
@@ -106,7 +130,7 @@ class Player(Entity):
             -MAX_PLAYER_VELOCITY, min(MAX_PLAYER_VELOCITY, self.velocity)
         )
 
-        self.coords.pos += self.coords.forward() * self.velocity
+        self.coords.pos.iadd(self.coords.forward().imul(self.velocity))
 
         # Decrease velocity gradually if player is not pushing throttle
         if not self.throttle_on:
@@ -118,48 +142,4 @@ class Player(Entity):
 
     def render(self):
         """Render the entity on the screen"""
-        image = pygame.transform.rotate(self.image, self.coords.rotation.to_degrees())
-        return image.copy()
-
-
-class Bullet(Entity):
-    """
-    A Bullet entity that is shot by the player, leaving
-    behind a bullet trail and moving forwards for 10 secs
-    """
-
-    coords: Coords
-    sprite: pygame.Surface
-    time_created: float
-
-    def __init__(self, coords: Coords, velocity: float):
-        super().__init__(coords, Vector2(1, 1))
-        self.sprite = pygame.image.load("assets/ammo/ammo.png").convert_alpha()
-        self.time_created = pygame.time.get_ticks()
-        self.velocity = velocity
-
-    def update(self):
-        """Called every frame, at 60 frames a second"""
-        # Destroy bullets after 5 seconds
-        if pygame.time.get_ticks() - self.time_created > 5000:
-            self.dead = True
-            return
-
-        BULLET_SPEED = -1.1
-        self.coords.pos += self.coords.forward() * (self.velocity + BULLET_SPEED)
-        super().update()
-
-    def render(self):
-        """Render the entity on the screen"""
-        # Image is a small red rectangle with a bullet trail
-        image = pygame.transform.scale(self.sprite, (3, 8))
-
-        # Draw bullet trail
-        # pygame.draw.line(image, (255, 0, 0), (1, 0), (1, 50))
-
-        # Draw bullet
-        # pygame.draw.rect(ima ge, (255, 0, 0), pygame.Rect(0, 0, 3, 8))
-
-        # Rotate bullet
-        image = pygame.transform.rotate(image, self.coords.rotation.to_degrees())
-        return image.copy()
+        return self.atlas.get(self.coords.rotation)
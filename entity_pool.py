@@ -0,0 +1,66 @@
+"""
+This module contains the EntityPool class, which recycles dead entities
+instead of allocating new ones
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+EntityT = TypeVar("EntityT", bound="Entity")
+
+
+class EntityPool(Generic[EntityT]):
+    """
+    Free list of entities of one type
+    Acquired entities are either recycled through Entity.reset or constructed,
+    and go back to the pool they came from when released
+    """
+
+    entity_type: type[EntityT]
+    free: list[EntityT]
+    in_use: int
+    high_water_mark: int  # Highest number of entities in use at the same time
+    created: int
+    reused: int
+
+    def __init__(self, entity_type: type[EntityT]):
+        self.entity_type = entity_type
+        self.free = []
+        self.in_use = 0
+        self.high_water_mark = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args, **kwargs) -> EntityT:
+        """Returns an entity initialized with the given constructor arguments"""
+        if self.free:
+            entity = self.free.pop()
+            entity.reset(*args, **kwargs)
+            self.reused += 1
+        else:
+            entity = self.entity_type(*args, **kwargs)
+            self.created += 1
+
+        entity.pool = self
+        self.in_use += 1
+        self.high_water_mark = max(self.high_water_mark, self.in_use)
+        return entity
+
+    def release(self, entity: EntityT):
+        """Give an entity back to the pool once it is dead"""
+        entity.pool = None
+        self.free.append(entity)
+        self.in_use -= 1
+
+    def stats(self):
+        """Returns pool usage statistics"""
+        return {
+            "in_use": self.in_use,
+            "free": len(self.free),
+            "high_water_mark": self.high_water_mark,
+            "created": self.created,
+            "reused": self.reused,
+        }
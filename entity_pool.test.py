@@ -0,0 +1,95 @@
+"""Test the entity_pool module"""
+
+import unittest
+from engine import engine
+from entity import Entity
+from entity_pool import EntityPool
+from game import Game
+from pos import Coords, Vector2
+
+
+class Drone(Entity):
+    """An entity with its own constructor, dying after ttl ticks"""
+
+    ttl: int
+
+    def __init__(self, pos: Vector2, ttl: int):
+        super().__init__(Coords(pos), Vector2(4, 4))
+        self.ttl = ttl
+
+    def update(self):
+        self.ttl -= 1
+        self.dead = self.ttl <= 0
+        super().update()
+
+
+class TestEntityPool(unittest.TestCase):
+    """Test recycling entities through a pool"""
+
+    def test_recycle(self):
+        """Test that a released entity is reused with the new constructor arguments"""
+        pool = EntityPool(Drone)
+        drone = pool.acquire(Vector2(1, 2), 3)
+        drone.update()
+        drone.dead = True
+        pool.release(drone)
+
+        recycled = pool.acquire(Vector2(5, 6), 10)
+        self.assertIs(recycled, drone)
+        self.assertIs(recycled.pool, pool)
+        self.assertEqual(recycled.coords.pos, Vector2(5, 6))
+        self.assertEqual(recycled.ttl, 10)
+        self.assertFalse(recycled.dead)
+        self.assertEqual(
+            pool.stats(),
+            {
+                "in_use": 1,
+                "free": 0,
+                "high_water_mark": 1,
+                "created": 1,
+                "reused": 1,
+            },
+        )
+
+    def test_high_water_mark(self):
+        """Test that the high water mark counts entities in use at the same time"""
+        pool = EntityPool(Drone)
+        drones = [pool.acquire(Vector2(0, 0), 1) for _ in range(3)]
+        for drone in drones:
+            pool.release(drone)
+        pool.acquire(Vector2(0, 0), 1)
+        self.assertEqual(pool.high_water_mark, 3)
+        self.assertEqual(pool.created, 3)
+
+
+class TestSpawn(unittest.TestCase):
+    """Test spawning entities in a level"""
+
+    @classmethod
+    def setUpClass(cls):
+        engine.start(headless=True, preload=False)
+
+    @classmethod
+    def tearDownClass(cls):
+        engine.stop()
+
+    def test_respawn(self):
+        """Test that an entity that died in the level is recycled by the next spawn"""
+        level = Game(engine.screen).level
+        drone = level.spawn(Drone, Vector2(1, 1), 2)
+        self.assertIn(drone, level.entities)
+
+        level.update_all()
+        self.assertIn(drone, level.entities)
+        level.update_all()
+        self.assertNotIn(drone, level.entities)
+
+        respawned = level.spawn(Drone, Vector2(40, 40), 5)
+        self.assertIs(respawned, drone)
+        self.assertEqual(respawned.ttl, 5)
+        self.assertIn(respawned, level.entities.query_radius(Vector2(40, 40), 1))
+        self.assertEqual(level.pools[Drone].stats()["reused"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
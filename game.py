@@ -1,31 +1,27 @@
 """ The main game file """
 
-import threading
 import time
-import math
 import pygame
-from pygame.constants import (
-    K_UP,
-    K_DOWN,
-    K_LEFT,
-    K_RIGHT,
-    K_1,
-    K_2,
-    K_3,
-    K_4,
-    K_5,
-    K_6,
-    K_7,
-    K_8,
-    K_s,
-    K_l,
-    K_ESCAPE,
-    K_SPACE,
-    QUIT,
-)
+from pygame.constants import QUIT
+from controls import Action, InputHandler
+from engine import engine
 from level import Level
+from profiler import profiler
 from pos import Vector2, Rotation
-from variables import RESOLUTION, GameStates
+from variables import (
+    GameStates,
+    MAX_FPS,
+    MAX_FRAME_TIME,
+    TICK_DURATION,
+    TICK_RATE,
+    PLAYER_ACCELERATION,
+    PLAYER_TURN_SPEED,
+    SHOOT_COOLDOWN,
+    PROFILER_TRACE,
+)
+
+# Rotation of the player per tick while turning
+TURN_STEP = Rotation.from_degrees(PLAYER_TURN_SPEED / TICK_RATE)
 
 
 class Game:
@@ -35,15 +31,25 @@ class Game:
     level: Level
     # Camera position always follows player for now
     camera_position: Vector2
-    last_click: int
-    last_keypress: int
     state: GameStates
+    input: InputHandler
+    last_shot_tick: int
+    clock: pygame.time.Clock
+    accumulator: float  # Simulation time (in seconds) not yet consumed by ticks
+    tick_count: int
+    timings: dict[str, float]  # Time spent in each scope of the last frame, in ms
 
     def __init__(self, screen: pygame.Surface):
         self.camera_position = Vector2(3, 4)
-        self.level = Level(Vector2(24, 24), self)
+        self.level = Level(self)
         self.screen = screen
         self.state = GameStates.PLAYING
+        self.input = InputHandler()
+        self.last_shot_tick = -round(SHOOT_COOLDOWN * TICK_RATE)
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+        self.tick_count = 0
+        self.timings = profiler.last
 
     def play_music(self):
         """Plays the main game music"""
@@ -78,128 +84,137 @@ class Game:
         print("Game closed")
         exit()
 
-    def move_player(self):
-        """Move the player"""
-        INCREMENT = 0.07
-        time_since_last_shoot = pygame.time.get_ticks()
-        while True:
-            if self.state == GameStates.PLAYING:
-                keys = pygame.key.get_pressed()
-                player0 = self.level.players[0]
-                # player_forward_vector = player0.coords.forward() * INCREMENT
-
-                if keys[K_UP]:
-                    player0.velocity -= 1
-                    player0.throttle_on = True
-
-                if keys[K_DOWN]:
-                    player0.velocity += 1
-                    player0.throttle_on = True
-
-                if keys[K_LEFT]:
-                    player0.coords.rotation += Rotation.from_degrees(10)
-
-                if keys[K_RIGHT]:
-                    player0.coords.rotation -= Rotation.from_degrees(10)
-
-                if (
-                    not keys[K_UP]
-                    and not keys[K_DOWN]
-                    and not keys[K_LEFT]
-                    and not keys[K_RIGHT]
-                ):
-                    player0.throttle_on = False
-
-                if keys[K_SPACE]:
-                    if time_since_last_shoot + 150 < pygame.time.get_ticks():
-                        time_since_last_shoot = pygame.time.get_ticks()
-                        bullets = player0.shoot()
-                        for bullet in bullets:
-                            self.level.entities.append(bullet)
-
-                self.camera_position = player0.coords.pos
-                time.sleep(0.05)
+    def handle_input(self):
+        """Apply the input sampled for this tick to the game"""
+        for action, argument in self.input.pressed:
+            if action == Action.TOGGLE_PROFILER:
+                profiler.visible = not profiler.visible
+            elif action == Action.DUMP_PROFILE:
+                profiler.dump(PROFILER_TRACE)
+                print(f"Profile written to {PROFILER_TRACE}")
+            elif action == Action.TOGGLE_MENU:
+                if self.state == GameStates.PLAYING:
+                    self.pause()
+                elif self.state == GameStates.MENU:
+                    self.resume()
+            elif self.state != GameStates.PLAYING:
+                continue
+            elif action == Action.SAVE:
+                self.level.save()
+            elif action == Action.LOAD:
+                self.level.load()
+            elif action == Action.SELECT_TILE:
+                self.level.selected_tile = argument
+                # Reset ghost rotation when changing tiles
+                self.level.current_ghost_rotation = 0
+            elif action == Action.TOGGLE_EDIT:
+                self.level.edit_mode = not self.level.edit_mode
+            elif not self.level.edit_mode:
+                continue
+            elif action == Action.PLACE_TILE:
+                self.level.place_tile(self.level.mouse_to_in_game_coordinates())
+            elif action == Action.REMOVE_TILE:
+                self.level.set_tile(self.level.mouse_to_in_game_coordinates(), None)
+
+        if self.state != GameStates.PLAYING:
+            return
+
+        held = self.input.held
+        player0 = self.level.players[0]
+
+        if Action.THRUST in held:
+            player0.velocity -= PLAYER_ACCELERATION / TICK_RATE
+        if Action.BRAKE in held:
+            player0.velocity += PLAYER_ACCELERATION / TICK_RATE
+        if Action.TURN_LEFT in held:
+            player0.coords.rotation.iadd(TURN_STEP)
+        if Action.TURN_RIGHT in held:
+            player0.coords.rotation.isub(TURN_STEP)
+
+        player0.throttle_on = bool(
+            held & {Action.THRUST, Action.BRAKE, Action.TURN_LEFT, Action.TURN_RIGHT}
+        )
+
+        if (
+            Action.SHOOT in held
+            and self.tick_count - self.last_shot_tick >= SHOOT_COOLDOWN * TICK_RATE
+        ):
+            self.last_shot_tick = self.tick_count
+            player0.shoot(self.level.bullets)
 
     def loop(self):
         """The main game loop"""
-        self.last_click = pygame.time.get_ticks()
-        self.last_keypress = pygame.time.get_ticks()
-
-        player_thread = threading.Thread(target=self.move_player)
-        player_thread.start()
         self.play_music()
+        previous_time = time.perf_counter()
         while True:
-            # Check for pressed keys
-            keys = pygame.key.get_pressed()
-
-            if self.last_keypress + 100 < pygame.time.get_ticks():
-                self.last_keypress = pygame.time.get_ticks()
-
-                if self.state == GameStates.PLAYING:
-                    # If S key is pressed, save game: if L key is pressed, load game
-                    if keys[K_s]:
-                        self.level.save()
-                    if keys[K_l]:
-                        self.level.load()
-
-                    # If keys 1-9 are pressed, select the corresponding tile
-                    if keys[K_1]:
-                        self.level.selected_tile = 0
-                    if keys[K_2]:
-                        self.level.selected_tile = 1
-                    if keys[K_3]:
-                        self.level.selected_tile = 2
-                    if keys[K_4]:
-                        self.level.selected_tile = 3
-                    if keys[K_5]:
-                        self.level.selected_tile = 4
-                    if keys[K_6]:
-                        self.level.selected_tile = 5
-                    if keys[K_7]:
-                        self.level.selected_tile = 6
-                    if keys[K_8]:
-                        self.level.selected_tile = 7
-
-                    # If any of these keys are pressed, reset ghost rotation to 0
-                    if (
-                        keys[K_1]
-                        or keys[K_2]
-                        or keys[K_3]
-                        or keys[K_4]
-                        or keys[K_5]
-                        or keys[K_6]
-                        or keys[K_7]
-                        or keys[K_8]
-                    ):
-                        self.level.current_ghost_rotation = 0
-
-                if keys[K_ESCAPE]:
-                    if self.state == GameStates.PLAYING:
-                        self.pause()
-                    elif self.state == GameStates.MENU:
-                        self.resume()
-
-            self.screen.fill((0, 0, 0))
-            self.level.render(self.camera_position)
+            frame_start = time.perf_counter()
+            self.accumulator += min(frame_start - previous_time, MAX_FRAME_TIME)
+            previous_time = frame_start
+
+            with profiler.scope("events"):
+                self.handle_events()
+
+            # Run as many fixed-length ticks as the elapsed time allows
+            with profiler.scope("update"):
+                while self.accumulator >= TICK_DURATION:
+                    self.tick()
+                    self.accumulator -= TICK_DURATION
+
+            # How far we are between the last tick and the next one
+            with profiler.scope("render"):
+                dirty_rects = self.render(self.accumulator / TICK_DURATION)
+
+            with profiler.scope("flip"):
+                if dirty_rects is None:
+                    pygame.display.flip()
+                elif dirty_rects:
+                    pygame.display.update(dirty_rects)
+
+            self.end_frame()
+            self.clock.tick(MAX_FPS)
+
+    def end_frame(self):
+        """Record the counters of the frame and close it in the profiler"""
+        for name, value in self.level.render_stats.items():
+            profiler.count(name, value)
+        profiler.count("stars.blits", self.level.starfield_renderer.blits)
+        profiler.count("entities", len(self.level.entities))
+        profiler.count("bullets", len(self.level.bullets))
+        profiler.count("chunks.loaded", len(self.level.tiles))
+        profiler.end_frame()
+        self.timings = profiler.last
+
+    def tick(self):
+        """Advance the simulation by one fixed-length tick"""
+        self.input.sample()
+        self.handle_input()
+        with profiler.scope("update.entities"):
             self.level.update_all()
-            pygame.display.flip()
-
-            # Cap at 60 FPS
-            pygame.time.Clock().tick(60)
+        self.camera_position = self.level.players[0].coords.pos
+        with profiler.scope("update.chunks"):
+            self.level.update_chunks(self.camera_position)
+        self.tick_count += 1
+
+    def render(self, alpha: float):
+        """
+        Render a frame, alpha being the fraction of a tick elapsed since the
+        last simulation update (used to interpolate positions)
+        Returns the screen rectangles that changed, or None if the whole screen did
+        """
+        return self.level.render(
+            self.level.players[0].interpolated_pos(alpha),
+            alpha,
+        )
 
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    pygame.quit()
-                    print("Game closed")
-                    exit()
+    def handle_events(self):
+        """Handle window events, queueing key presses for the next tick"""
+        for event in pygame.event.get():
+            if event.type == QUIT:
+                self.quit()
+            self.input.handle_event(event)
 
 
 if __name__ == "__main__":
-    screen1 = pygame.display.set_mode(RESOLUTION)
-    pygame.display.set_caption("The Game")
-    pygame.font.init()
-    pygame.display.init()
-    pygame.mixer.init()
-    game = Game(screen1)
+    game = Game(engine.start())
     print("Game initialized")
     game.loop()
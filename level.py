@@ -5,12 +5,26 @@ map of tiles and render them to the screen
 from __future__ import annotations
 from typing import TYPE_CHECKING, Any
 import random
+import math
 import pygame
 from pos import Vector2, Coords
 from tile import Tile, TileType
+from tile_types import TileRegistry, NEIGHBOUR_OFFSETS
 from ui import UI
-from variables import ZOOM
+from variables import (
+    ZOOM,
+    CHUNK_SIZE,
+    SPATIAL_CELL_SIZE,
+    CULL_MARGIN,
+    DIRTY_RECTS,
+    MAX_DIRTY_RECTS,
+)
+from bullets import BulletPool
+from chunks import Chunk, ChunkStore, ChunkGenerator, EMPTY_TILE
 from entity import Player, Entity
+from entity_pool import EntityPool
+from profiler import profiler
+from spatial_hash import SpatialHash
 from stars import StarfieldRenderer
 
 if TYPE_CHECKING:
@@ -25,72 +39,174 @@ def clamp(n, smallest, largest):
 class Level:
     """Each level is its own map of 2D tiles"""
 
-    size: Vector2
-    tiles: list[Tile | None]
+    tiles: ChunkStore  # IDs in TileRegistry, unbounded in every direction
+    # Autotiled sprite of each cell of a chunk, updated cell by cell on edits
+    chunk_sprites: dict[tuple[int, int], list[pygame.Surface | None]]
+    # Pre-rendered tiles of each chunk (None for empty chunks), rebuilt when
+    # the sprite of one of its cells changes
+    chunk_surfaces: dict[tuple[int, int], pygame.Surface | None]
+    tiles_changed: bool  # Whether a chunk was rebuilt during the frame
     game: Game
     ui: UI
     edit_mode: bool
     map_editor_hotbar: list[TileType | None]
     selected_tile: int  # Index of selected tile in tile hotbar
     players: list[Player]
-    entities: list[Entity]  # Doesnt contain players
+    entities: SpatialHash  # Doesnt contain players
+    bullets: BulletPool
+    pools: dict[type[Entity], EntityPool]
     random_star_state: int
     starfield_renderer: StarfieldRenderer
-
-    def __init__(self, size: Vector2, game: Game):
-        self.size = size
+    # Entities drawn and culled, chunks drawn, and surfaces allocated, in the last frame
+    render_stats: dict[str, int]
+    # Render targets reused between frames, recreated when the screen size changes
+    framebuffer: pygame.Surface | None
+    zoomed_framebuffer: pygame.Surface | None
+    # Where sprites were drawn this frame and the previous one (None if not tracked)
+    sprite_rects: list[pygame.Rect] | None
+    previous_sprite_rects: list[pygame.Rect]
+    previous_camera: tuple[float, float] | None
+
+    def __init__(self, game: Game, generator: ChunkGenerator | None = None):
         self.game = game
 
+        self.tiles = ChunkStore(generator)
+        self.chunk_sprites = {}
+        self.chunk_surfaces = {}
+        self.tiles_changed = False
+        self.edit_mode = False
+        # Every tile type, then empty slots which remove tiles
+        self.map_editor_hotbar = (TileRegistry.types() + [None] * 8)[:8]
+        self.selected_tile = 0
+
         self.ui = UI(self.game, self)
         self.props = {}
 
         self.players = []
-        self.entities = []
+        self.entities = SpatialHash(SPATIAL_CELL_SIZE)
+        self.bullets = BulletPool()
+        self.pools = {}
+        self.render_stats = {"drawn": 0, "culled": 0, "chunks": 0, "allocations": 0}
+        self.framebuffer = None
+        self.zoomed_framebuffer = None
+        self.sprite_rects = [] if DIRTY_RECTS else None
+        self.previous_sprite_rects = []
+        self.previous_camera = None
 
         # Get center position
         center_pos = self.game.camera_position
         # Load player 1
-        self.players.append(Player(Coords(center_pos, None)))
+        self.players.append(Player(Coords(center_pos.copy(), None)))
 
         self.random_star_state = random.randint(0, 1000000)
 
         self.starfield_renderer = StarfieldRenderer(self.random_star_state)
 
     def mouse_to_in_game_coordinates(self):
-        """Returns the mouse position in in-game coordinates"""
+        """Returns the mouse position in in-game coordinates (in tiles)"""
         mouse_pos = Vector2(*pygame.mouse.get_pos())
         mouse_pos -= Vector2(
             self.game.screen.get_width() / 2, self.game.screen.get_height() / 2
         )
         mouse_pos /= Vector2(16 * ZOOM, 16 * ZOOM)
         mouse_pos += self.game.camera_position
-        return mouse_pos.to_int()
+        return mouse_pos
 
-    def render(self, camera_position: Vector2):
+    def render(self, camera_position: Vector2, alpha: float = 1.0):
         """
         Render the level onto the screen, with the camera position taken into account
         (0, 0) camera position is the center of the screen, the level is initially drawn
         with the top left corner at (0, 0)
+        alpha is the fraction of a tick elapsed since the last update, used to
+        interpolate entity positions between ticks
+        Returns the screen rectangles that changed, or None if the whole screen did
         """
-        final_render = pygame.Surface(
-            (self.game.screen.get_width() / ZOOM, self.game.screen.get_height() / ZOOM),
-            pygame.SRCALPHA,
-        )
+        self.render_stats["allocations"] = 0
+        final_render = self.get_framebuffer()
 
-        self.render_stars()
+        # Draw sprites first, so we know where they are before compositing the screen
+        if self.sprite_rects is not None:
+            self.sprite_rects = []
 
-        # Render players
-        self.render_players(final_render)
+        with profiler.scope("render.tiles"):
+            self.render_tiles(final_render, camera_position)
 
-        self.render_entities(final_render)
+        with profiler.scope("render.entities"):
+            # Render players
+            self.render_players(final_render)
 
-        # Apply zoom and blit to screen
-        self.apply_zoom_and_blit(final_render)
+            self.render_entities(final_render, camera_position, alpha)
 
-        # Render UI
-        self.render_ui()
+        with profiler.scope("render.ui"):
+            ui_surface = self.ui.render(self.players[0])
+
+        # Only composite the part of the screen that changed
+        dirty_rects = self.get_dirty_rects(camera_position)
+        if dirty_rects is not None:
+            if not dirty_rects:
+                return dirty_rects
+            self.game.screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+
+        with profiler.scope("render.stars"):
+            self.game.screen.fill((0, 0, 0))
+
+            self.render_stars(camera_position)
+
+        with profiler.scope("render.composite"):
+            # Apply zoom and blit to screen
+            self.apply_zoom_and_blit(final_render)
+
+            # Render UI
+            self.render_ui(ui_surface)
+
+        self.game.screen.set_clip(None)
+        return dirty_rects
 
-    def render_stars(self):
+    def get_framebuffer(self):
+        """
+        Returns the cleared render target for the unzoomed level,
+        allocating the render targets only when the screen size changed
+        """
+        screen_size = self.game.screen.get_size()
+        size = (int(screen_size[0] / ZOOM), int(screen_size[1] / ZOOM))
+
+        if self.framebuffer is not None and self.framebuffer.get_size() == size:
+            self.framebuffer.fill((0, 0, 0, 0))
+            return self.framebuffer
+
+        self.framebuffer = pygame.Surface(size, pygame.SRCALPHA)
+        self.render_stats["allocations"] += 1
+        if ZOOM != 1:
+            self.zoomed_framebuffer = pygame.Surface(screen_size, pygame.SRCALPHA)
+            self.render_stats["allocations"] += 1
+        return self.framebuffer
+
+    def get_dirty_rects(self, camera_position: Vector2):
+        """
+        Returns the screen rectangles that changed since the last frame,
+        or None if the whole screen must be redrawn
+        """
+        if self.sprite_rects is None:
+            return None
+
+        camera = camera_position.to_tuple()
+        # Sprites must be redrawn where they are now and erased where they were
+        rects = self.previous_sprite_rects + self.sprite_rects
+        self.previous_sprite_rects = self.sprite_rects
+
+        # Moving the camera scrolls the whole background
+        if (
+            camera != self.previous_camera
+            or self.tiles_changed
+            or self.ui.dirty_rects is None
+            or len(rects) + len(self.ui.dirty_rects) > MAX_DIRTY_RECTS
+        ):
+            self.previous_camera = camera
+            return None
+
+        return rects + self.ui.dirty_rects
+
+    def render_stars(self, camera_position: Vector2):
         """
         Renders white circles of varying small sizes on the screen,
         with a parallax effect relative to the player
@@ -102,15 +218,81 @@ class Level:
 
         self.starfield_renderer.render(
             self.game.screen,
-            self.game.camera_position,
+            camera_position,
         )
 
+    def render_tiles(self, final_render: pygame.Surface, camera_position: Vector2):
+        """Render the chunks of the map that are on screen, from their cached surfaces"""
+        width = final_render.get_width()
+        height = final_render.get_height()
+        pixels_per_tile = 16 * ZOOM
+        chunk_pixels = CHUNK_SIZE * pixels_per_tile
+
+        # Screen position of the top left corner of chunk (0, 0)
+        origin_x = width / 2 - camera_position.x * pixels_per_tile
+        origin_y = height / 2 - camera_position.y * pixels_per_tile
+
+        self.tiles_changed = False
+        blits = []
+        for chunk_y in range(
+            math.floor(-origin_y / chunk_pixels),
+            math.floor((height - origin_y) / chunk_pixels) + 1,
+        ):
+            for chunk_x in range(
+                math.floor(-origin_x / chunk_pixels),
+                math.floor((width - origin_x) / chunk_pixels) + 1,
+            ):
+                position = (chunk_x, chunk_y)
+                if position in self.chunk_surfaces:
+                    surface = self.chunk_surfaces[position]
+                else:
+                    surface = self.render_chunk(self.tiles.get_chunk(position))
+                    self.chunk_surfaces[position] = surface
+                    self.tiles_changed = True
+
+                if surface is not None:
+                    blits.append(
+                        (
+                            surface,
+                            (
+                                origin_x + chunk_x * chunk_pixels,
+                                origin_y + chunk_y * chunk_pixels,
+                            ),
+                        )
+                    )
+
+        final_render.blits(blits, False)
+        self.render_stats["chunks"] = len(blits)
+
+    def render_chunk(self, chunk: Chunk):
+        """
+        Returns the tiles of a chunk drawn on one surface, or None if it has no tiles
+        Tiles larger than 1x1 are cut off at the edge of the chunk
+        """
+        if chunk.is_empty():
+            return None
+
+        surface = pygame.Surface((CHUNK_SIZE * 16, CHUNK_SIZE * 16), pygame.SRCALPHA)
+        self.render_stats["allocations"] += 1
+        surface.blits(
+            [
+                (sprite, (i % CHUNK_SIZE * 16, i // CHUNK_SIZE * 16))
+                for i, sprite in enumerate(self.get_chunk_sprites(chunk))
+                if sprite is not None
+            ],
+            False,
+        )
+
+        if ZOOM != 1:
+            surface = pygame.transform.scale_by(surface, ZOOM)
+        return surface
+
     def render_players(self, final_render: pygame.Surface):
         """Render all players onto the screen"""
         # Render player
         for player in self.players:
             player_surface = player.render()
-            final_render.blit(
+            rect = final_render.blit(
                 player_surface,
                 (
                     # Center player surface at center of screen
@@ -118,52 +300,186 @@ class Level:
                     final_render.get_height() / 2 - player_surface.get_height() / 2,
                 ),
             )
-
-    def render_entities(self, final_render: pygame.Surface):
-        """Render all entities onto the screen"""
-        # Render entities
-        for entity in self.entities.copy():
-            entity_surface = entity.render()
-
+            if self.sprite_rects is not None:
+                self.sprite_rects.append(self.to_screen_rect(rect))
+
+    def render_entities(
+        self, final_render: pygame.Surface, camera_position: Vector2, alpha: float
+    ):
+        """Render the entities and bullets that are on screen, skipping the others"""
+        width = final_render.get_width()
+        height = final_render.get_height()
+        pixels_per_tile = 16 * ZOOM
+
+        # Entities are indexed by their current position but drawn at their
+        # interpolated one, so also look one cell further than the screen edges
+        margin = CULL_MARGIN / pixels_per_tile + SPATIAL_CELL_SIZE
+        half_width = width / 2 / pixels_per_tile + margin
+        half_height = height / 2 / pixels_per_tile + margin
+
+        drawn = 0
+        for entity in self.entities.query_rect(
+            camera_position.x - half_width,
+            camera_position.y - half_height,
+            camera_position.x + half_width,
+            camera_position.y + half_height,
+        ):
             # Calculate screen position based on distance from player (center of screen)
-            offset_from_screen_center = entity.coords.pos - self.game.camera_position
+            offset_from_screen_center = entity.interpolated_pos(alpha) - camera_position
+            center_x = width / 2 + offset_from_screen_center.x * pixels_per_tile
+            center_y = height / 2 + offset_from_screen_center.y * pixels_per_tile
+
+            # Rotated sprites are at most CULL_MARGIN pixels from their center
+            if (
+                center_x < -CULL_MARGIN
+                or center_x > width + CULL_MARGIN
+                or center_y < -CULL_MARGIN
+                or center_y > height + CULL_MARGIN
+            ):
+                continue
 
-            final_render.blit(
+            entity_surface = entity.render()
+            rect = final_render.blit(
                 entity_surface,
                 (
-                    # Center entity surface at center of screen
-                    final_render.get_width() / 2
-                    - entity_surface.get_width() / 2
-                    + offset_from_screen_center.x * 16 * ZOOM,
-                    final_render.get_height() / 2
-                    - entity_surface.get_height() / 2
-                    + offset_from_screen_center.y * 16 * ZOOM,
+                    # Center entity surface on its position
+                    center_x - entity_surface.get_width() / 2,
+                    center_y - entity_surface.get_height() / 2,
                 ),
             )
+            if self.sprite_rects is not None:
+                self.sprite_rects.append(self.to_screen_rect(rect))
+            drawn += 1
+
+        bullet_rects = [] if self.sprite_rects is not None else None
+        drawn += self.bullets.render(final_render, camera_position, alpha, bullet_rects)
+        if bullet_rects:
+            self.sprite_rects.extend(self.to_screen_rect(rect) for rect in bullet_rects)
+
+        self.render_stats["drawn"] = drawn
+        self.render_stats["culled"] = len(self.entities) + len(self.bullets) - drawn
+
+    def get_tile(self, pos: Vector2) -> TileType | None:
+        """Returns the type of the tile at pos (in tiles), or None if there is none"""
+        return TileRegistry[self.tiles.get_tile(math.floor(pos.x), math.floor(pos.y))]
+
+    def set_tile(self, pos: Vector2, tile_type: TileType | None):
+        """Places a tile of the given type at pos (in tiles), or removes it if None"""
+        self.tiles.set_tile(
+            math.floor(pos.x),
+            math.floor(pos.y),
+            tile_type.id if tile_type else EMPTY_TILE,
+        )
+        self.update_tile_sprites(pos)
+
+    def get_surrounding_tiles(self, pos: Vector2) -> list[TileType | None]:
+        """Returns the types of the 8 tiles around pos, clockwise from the top left"""
+        x = math.floor(pos.x)
+        y = math.floor(pos.y)
+        return [
+            TileRegistry[self.tiles.get_tile(x + dx, y + dy)]
+            for dx, dy in NEIGHBOUR_OFFSETS
+        ]
+
+    def get_tile_sprite(self, x: int, y: int) -> pygame.Surface | None:
+        """Returns the sprite of the tile at (x, y), chosen from its surroundings"""
+        tile_type = TileRegistry[self.tiles.get_tile(x, y)]
+        if tile_type is None:
+            return None
+        tile = Tile(tile_type)
+        tile.load_surfaces(self.get_surrounding_tiles(Vector2(x, y)))
+        return tile.render(Vector2(x, y))
+
+    def get_chunk_sprites(self, chunk: Chunk):
+        """Returns the sprite of every cell of a chunk, computing them the first time"""
+        sprites = self.chunk_sprites.get(chunk.position)
+        if sprites is None:
+            origin_x, origin_y = chunk.origin
+            sprites = [
+                self.get_tile_sprite(origin_x + x, origin_y + y)
+                for y in range(CHUNK_SIZE)
+                for x in range(CHUNK_SIZE)
+            ]
+            self.chunk_sprites[chunk.position] = sprites
+        return sprites
+
+    def update_tile_sprites(self, pos: Vector2):
+        """
+        Recompute the sprites of the tile at pos and of the 8 tiles around it,
+        and forget the rendered chunks where a sprite changed
+        """
+        x = math.floor(pos.x)
+        y = math.floor(pos.y)
+        for cell_y in range(y - 1, y + 2):
+            for cell_x in range(x - 1, x + 2):
+                position = self.tiles.chunk_of(cell_x, cell_y)
+                sprites = self.chunk_sprites.get(position)
+                if sprites is None:
+                    # Computed in full when the chunk is rendered again
+                    self.chunk_surfaces.pop(position, None)
+                    continue
+                i = cell_x % CHUNK_SIZE + cell_y % CHUNK_SIZE * CHUNK_SIZE
+                sprite = self.get_tile_sprite(cell_x, cell_y)
+                if sprite is not sprites[i]:
+                    sprites[i] = sprite
+                    self.chunk_surfaces.pop(position, None)
+
+    def place_tile(self, pos: Vector2):
+        """Places the tile selected in the map editor hotbar at pos (in tiles)"""
+        self.set_tile(pos, self.map_editor_hotbar[self.selected_tile])
+
+    def update_chunks(self, camera_position: Vector2):
+        """Load the chunks of the map around the camera, and evict distant ones"""
+        self.tiles.update(camera_position)
+        for cache in (self.chunk_sprites, self.chunk_surfaces):
+            if len(cache) > len(self.tiles):
+                for position in [
+                    position for position in cache if position not in self.tiles.chunks
+                ]:
+                    del cache[position]
 
     def update_all(self):
         """Update entities and players, and remove dead entities"""
         # Update players
         for player in self.players:
+            player.previous_pos.assign(player.coords.pos)
             player.update()
 
+        self.bullets.update()
+
         # Update entities
-        for entity in self.entities.copy():
+        for entity in list(self.entities):
+            entity.previous_pos.assign(entity.coords.pos)
             entity.update()
 
             if entity.dead:
                 self.entities.remove(entity)
+                if entity.pool is not None:
+                    entity.pool.release(entity)
+            else:
+                self.entities.move(entity)
+
+    def spawn(self, entity_type: type[Entity], *args, **kwargs):
+        """
+        Add an entity of the given type to the level, recycling a dead one if possible
+        The arguments are those of the entity's constructor
+        """
+        pool = self.pools.get(entity_type)
+        if pool is None:
+            pool = self.pools[entity_type] = EntityPool(entity_type)
+        entity = pool.acquire(*args, **kwargs)
+        self.entities.add(entity)
+        return entity
 
     def apply_zoom_and_blit(self, final_render: pygame.Surface):
         """Apply zoom and blit to screen"""
-        # Apply zoom
-        final_render = pygame.transform.scale(
-            final_render,
-            (
-                int(final_render.get_width() * ZOOM),
-                int(final_render.get_height() * ZOOM),
-            ),
-        )
+        # Apply zoom, scaling into the persistent zoomed render target
+        if ZOOM != 1:
+            final_render = pygame.transform.scale(
+                final_render,
+                self.zoomed_framebuffer.get_size(),
+                self.zoomed_framebuffer,
+            )
         self.game.screen.blit(
             final_render,
             (
@@ -172,10 +488,19 @@ class Level:
             ),
         )
 
-    def render_ui(self):
+    def render_ui(self, ui_surface: pygame.Surface):
         """Render UI"""
         # Render UI
-        self.game.screen.blit(self.ui.render(self.players[0]), (0, 0))
+        self.game.screen.blit(ui_surface, (0, 0))
+        if profiler.visible:
+            self.game.screen.blit(self.ui.profiler_overlay.render(), (10, 10))
+
+    @staticmethod
+    def to_screen_rect(rect: pygame.Rect):
+        """Convert a rectangle of the unzoomed render to screen coordinates"""
+        if ZOOM == 1:
+            return rect
+        return pygame.Rect(rect.x * ZOOM, rect.y * ZOOM, rect.w * ZOOM, rect.h * ZOOM)
 
     def save(self):
         """Save the level to a savefile"""
@@ -217,7 +542,7 @@ class Level:
             self.tiles = []
 
             for tile in data["tiles"]:
-                self.tiles.append(Tile(TileRegistry[tile]()) if tile else None)
+                self.tiles.append(Tile(TileRegistry[tile]) if tile else None)
 
             self.size = Pos(data["size"][0], data["size"][1])
             self.game.camera_position = Pos(
@@ -1,11 +1,14 @@
 """ This file contains the Pos class, which is used to represent a 2D position in the game """
 
 import math
+import numpy as np
 
 
 class Vector2:
     """A 2D vector"""
 
+    __slots__ = ("x", "y")
+
     x: float
     y: float
 
@@ -30,24 +33,54 @@ class Vector2:
 
     def __mul__(self, other):
         """Multiply the vector by another vector or a scalar"""
-        if isinstance(other, Vector2):
+        # Checking the class directly is cheaper than isinstance
+        if other.__class__ is Vector2:
             return Vector2(self.x * other.x, self.y * other.y)
-        else:
-            return Vector2(self.x * other, self.y * other)
+        return Vector2(self.x * other, self.y * other)
 
     def __truediv__(self, other):
         """Divide the vector by another vector or a scalar"""
-        if isinstance(other, Vector2):
+        if other.__class__ is Vector2:
             return Vector2(self.x / other.x, self.y / other.y)
-        else:
-            return Vector2(self.x / other, self.y / other)
+        return Vector2(self.x / other, self.y / other)
 
     def __floordiv__(self, other):
         """Divide the vector by another vector or a scalar (floor)"""
-        if isinstance(other, Vector2):
+        if other.__class__ is Vector2:
             return Vector2(self.x // other.x, self.y // other.y)
+        return Vector2(self.x // other, self.y // other)
+
+    def iadd(self, other):
+        """Add another vector to this one in place, and return it"""
+        self.x += other.x
+        self.y += other.y
+        return self
+
+    def isub(self, other):
+        """Subtract another vector from this one in place, and return it"""
+        self.x -= other.x
+        self.y -= other.y
+        return self
+
+    def imul(self, other):
+        """Multiply this vector by another vector or a scalar in place, and return it"""
+        if other.__class__ is Vector2:
+            self.x *= other.x
+            self.y *= other.y
         else:
-            return Vector2(self.x // other, self.y // other)
+            self.x *= other
+            self.y *= other
+        return self
+
+    def assign(self, other):
+        """Copy the components of another vector into this one, and return it"""
+        self.x = other.x
+        self.y = other.y
+        return self
+
+    def copy(self):
+        """Get a copy of the vector"""
+        return Vector2(self.x, self.y)
 
     def __eq__(self, other):
         return self.x == other.x and self.y == other.y
@@ -55,6 +88,10 @@ class Vector2:
     def __neq__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        # Don't mutate a vector in place while it is used as a key
+        return hash((self.x, self.y))
+
     def to_int(self):
         """Convert the vector to integers"""
         return Vector2(int(self.x), int(self.y))
@@ -74,10 +111,42 @@ class Vector2:
 class Rotation:
     """A rotation, in radians (clamped to 2pi)"""
 
-    rotation: float
+    __slots__ = ("_rotation", "_sin", "_cos")
+
+    _rotation: float
+    # Cached sine and cosine of the rotation, None until first needed
+    _sin: float | None
+    _cos: float | None
 
     def __init__(self, rotation: float):
-        self.rotation = rotation
+        self._rotation = rotation
+        self._sin = None
+        self._cos = None
+
+    @property
+    def rotation(self) -> float:
+        """The rotation, in radians"""
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, rotation: float):
+        self._rotation = rotation
+        self._sin = None
+        self._cos = None
+
+    @property
+    def sin(self) -> float:
+        """Sine of the rotation, computed once per value"""
+        if self._sin is None:
+            self._sin = math.sin(self._rotation)
+        return self._sin
+
+    @property
+    def cos(self) -> float:
+        """Cosine of the rotation, computed once per value"""
+        if self._cos is None:
+            self._cos = math.cos(self._rotation)
+        return self._cos
 
     @staticmethod
     def from_degrees(degrees: float):
@@ -108,12 +177,35 @@ class Rotation:
         """Divides two rotations together (floor)"""
         return Rotation(self.rotation // other.rotation)
 
+    def iadd(self, other):
+        """Add another rotation to this one in place, and return it"""
+        self.rotation = self._rotation + other.rotation
+        return self
+
+    def isub(self, other):
+        """Subtract another rotation from this one in place, and return it"""
+        self.rotation = self._rotation - other.rotation
+        return self
+
+    def imul(self, other):
+        """Multiply this rotation by another one in place, and return it"""
+        self.rotation = self._rotation * other.rotation
+        return self
+
+    def copy(self):
+        """Get a copy of the rotation"""
+        return Rotation(self._rotation)
+
     def __eq__(self, other):
         return self.rotation == other.rotation
 
     def __neq__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        # Don't mutate a rotation in place while it is used as a key
+        return hash(self._rotation)
+
     def __str__(self):
         return f"Rotation({self.rotation})"
 
@@ -121,6 +213,8 @@ class Rotation:
 class Coords:
     """Holds Position and Rotation data"""
 
+    __slots__ = ("pos", "rotation")
+
     pos: Vector2
     rotation: Rotation
 
@@ -154,6 +248,9 @@ class Coords:
     def __neq__(self, other):
         return not self.__eq__(other)
 
+    def __hash__(self):
+        return hash((self.pos, self.rotation))
+
     def __str__(self):
         return f"Coords({self.pos}, {self.rotation})"
 
@@ -162,40 +259,216 @@ class Coords:
         Get the right vector of the coordinates, based on
         internal position and rotation (in radians)
         """
-        return Vector2(
-            math.cos(self.rotation.rotation),
-            -math.sin(self.rotation.rotation),
-        )
+        return Vector2(self.rotation.cos, -self.rotation.sin)
 
     def left(self):
         """
         Get the left vector of the coordinates, based on
         internal position and rotation (in radians)
         """
-        return Vector2(
-            -math.cos(self.rotation.rotation),
-            math.sin(self.rotation.rotation),
-        )
+        return Vector2(-self.rotation.cos, self.rotation.sin)
 
     def forward(self):
         """
         Get the forward vector of the coordinates, based on
         internal position and rotation (in radians)
         """
-        return Vector2(
-            math.sin(self.rotation.rotation),
-            math.cos(self.rotation.rotation),
-        )
+        return Vector2(self.rotation.sin, self.rotation.cos)
 
     def backward(self):
         """
         Get the backward vector of the coordinates, based on
         internal position and rotation (in radians)
         """
-        return Vector2(
-            -math.sin(self.rotation.rotation),
-            -math.cos(self.rotation.rotation),
-        )
+        return Vector2(-self.rotation.sin, -self.rotation.cos)
 
     def __repr__(self):
         return self.__str__()
+
+
+class Vector2Array:
+    """
+    Many 2D vectors stored as one (n, 2) NumPy array, with the same operators
+    as Vector2 applied to all of them at once
+    Slicing returns a view, so in-place operations on a slice modify the original
+    (indexing with a mask or a list of indices returns a copy, as in NumPy)
+    """
+
+    __slots__ = ("data",)
+
+    data: np.ndarray
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float64).reshape(-1, 2)
+
+    @staticmethod
+    def zeros(length: int):
+        """Create an array of length null vectors"""
+        return Vector2Array(np.zeros((length, 2)))
+
+    @staticmethod
+    def from_vectors(vectors: list[Vector2]):
+        """Create an array from a list of vectors"""
+        return Vector2Array([(vector.x, vector.y) for vector in vectors])
+
+    def to_vectors(self):
+        """Convert the array to a list of vectors"""
+        return [Vector2(x, y) for x, y in self.data.tolist()]
+
+    @property
+    def x(self) -> np.ndarray:
+        """The x components (a view)"""
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        """The y components (a view)"""
+        return self.data[:, 1]
+
+    def length(self) -> np.ndarray:
+        """Get the length of every vector"""
+        return np.hypot(self.data[:, 0], self.data[:, 1])
+
+    def normalized(self):
+        """Get the normalized vectors"""
+        return Vector2Array(self.data / self.length()[:, None])
+
+    @staticmethod
+    def operand(other):
+        """
+        Turn the other side of an operator into something that broadcasts
+        against an (n, 2) array: a vector array, a vector, a scalar or an
+        array of n scalars
+        """
+        if other.__class__ is Vector2Array:
+            return other.data
+        if other.__class__ is Vector2:
+            return np.array((other.x, other.y))
+        if isinstance(other, np.ndarray) and other.ndim == 1:
+            return other[:, None]
+        return other
+
+    def __add__(self, other):
+        return Vector2Array(self.data + self.operand(other))
+
+    def __sub__(self, other):
+        return Vector2Array(self.data - self.operand(other))
+
+    def __mul__(self, other):
+        """Multiply the vectors by vectors or scalars"""
+        return Vector2Array(self.data * self.operand(other))
+
+    def __truediv__(self, other):
+        """Divide the vectors by vectors or scalars"""
+        return Vector2Array(self.data / self.operand(other))
+
+    def __floordiv__(self, other):
+        """Divide the vectors by vectors or scalars (floor)"""
+        return Vector2Array(self.data // self.operand(other))
+
+    def iadd(self, other):
+        """Add to the vectors in place, and return them"""
+        self.data += self.operand(other)
+        return self
+
+    def isub(self, other):
+        """Subtract from the vectors in place, and return them"""
+        self.data -= self.operand(other)
+        return self
+
+    def imul(self, other):
+        """Multiply the vectors in place, and return them"""
+        self.data *= self.operand(other)
+        return self
+
+    def assign(self, other):
+        """Copy the components of other into these vectors, and return them"""
+        self.data[:] = self.operand(other)
+        return self
+
+    def copy(self):
+        """Get a copy of the array"""
+        return Vector2Array(self.data.copy())
+
+    def __getitem__(self, index):
+        """Get one vector (integer index) or several (slice, mask or indices)"""
+        if isinstance(index, (int, np.integer)):
+            x, y = self.data[index]
+            return Vector2(float(x), float(y))
+        return Vector2Array(self.data[index])
+
+    def __setitem__(self, index, value):
+        self.data[index] = self.operand(value)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __eq__(self, other):
+        return np.array_equal(self.data, other.data)
+
+    def __str__(self):
+        return f"Vector2Array({self.data.tolist()})"
+
+
+class CoordsArray:
+    """Many positions and rotations (in radians), stored as NumPy arrays"""
+
+    __slots__ = ("pos", "rotation")
+
+    pos: Vector2Array
+    rotation: np.ndarray
+
+    def __init__(self, pos: Vector2Array, rotation):
+        self.pos = pos
+        self.rotation = np.asarray(rotation, dtype=np.float64)
+
+    @staticmethod
+    def from_coords(coords: list[Coords]):
+        """Create an array from a list of coordinates"""
+        return CoordsArray(
+            Vector2Array.from_vectors([c.pos for c in coords]),
+            [c.rotation.rotation for c in coords],
+        )
+
+    def to_coords(self):
+        """Convert the array to a list of coordinates"""
+        return [
+            Coords(pos, Rotation(rotation))
+            for pos, rotation in zip(self.pos.to_vectors(), self.rotation.tolist())
+        ]
+
+    def __getitem__(self, index):
+        """Get one set of coordinates (integer index) or a view of several"""
+        if isinstance(index, (int, np.integer)):
+            return Coords(self.pos[index], Rotation(float(self.rotation[index])))
+        return CoordsArray(self.pos[index], self.rotation[index])
+
+    def __len__(self):
+        return len(self.rotation)
+
+    def right(self):
+        """Get the right vector of every rotation"""
+        return Vector2Array(
+            np.column_stack((np.cos(self.rotation), -np.sin(self.rotation)))
+        )
+
+    def left(self):
+        """Get the left vector of every rotation"""
+        return Vector2Array(
+            np.column_stack((-np.cos(self.rotation), np.sin(self.rotation)))
+        )
+
+    def forward(self):
+        """Get the forward vector of every rotation"""
+        return Vector2Array(
+            np.column_stack((np.sin(self.rotation), np.cos(self.rotation)))
+        )
+
+    def backward(self):
+        """Get the backward vector of every rotation"""
+        return Vector2Array(
+            np.column_stack((-np.sin(self.rotation), -np.cos(self.rotation)))
+        )
+
+    def __str__(self):
+        return f"CoordsArray({self.pos}, {self.rotation.tolist()})"
@@ -2,7 +2,9 @@
 
 import unittest
 import math
-from pos import Vector2, Rotation, Coords
+import random
+import numpy as np
+from pos import Vector2, Rotation, Coords, Vector2Array, CoordsArray
 
 
 class TestVector2(unittest.TestCase):
@@ -73,6 +75,33 @@ class TestVector2(unittest.TestCase):
         v2 = v1.to_tuple()
         self.assertEqual(v2, (1.5, 2.7))
 
+    def test_in_place(self):
+        """Test the in-place operations"""
+        v1 = Vector2(1, 2)
+        v2 = v1.iadd(Vector2(3, 4))
+        self.assertIs(v1, v2)
+        self.assertEqual(v1, Vector2(4, 6))
+        v1.isub(Vector2(1, 1))
+        self.assertEqual(v1, Vector2(3, 5))
+        v1.imul(2)
+        self.assertEqual(v1, Vector2(6, 10))
+        v1.imul(Vector2(0.5, 2))
+        self.assertEqual(v1, Vector2(3, 20))
+
+    def test_copy(self):
+        """Test the copy and assign methods"""
+        v1 = Vector2(1, 2)
+        v2 = v1.copy()
+        v1.iadd(Vector2(1, 1))
+        self.assertEqual(v2, Vector2(1, 2))
+        v2.assign(v1)
+        self.assertEqual(v2, Vector2(2, 3))
+
+    def test_hash(self):
+        """Test that equal vectors hash the same"""
+        self.assertEqual(hash(Vector2(1, 2)), hash(Vector2(1.0, 2.0)))
+        self.assertIn(Vector2(1, 2), {Vector2(1, 2)})
+
 
 class TestRotation(unittest.TestCase):
     """Test the Rotation class"""
@@ -129,6 +158,20 @@ class TestRotation(unittest.TestCase):
         r1 = Rotation(math.pi)
         self.assertEqual(r1.to_degrees(), 180.0)
 
+    def test_sin_cos(self):
+        """Test that the cached sine and cosine follow the rotation"""
+        r1 = Rotation(0.5)
+        self.assertEqual(r1.sin, math.sin(0.5))
+        self.assertEqual(r1.cos, math.cos(0.5))
+        r1.rotation = 1.2
+        self.assertEqual(r1.sin, math.sin(1.2))
+        r1.iadd(Rotation(0.5))
+        self.assertEqual(r1.cos, math.cos(1.7))
+
+    def test_hash(self):
+        """Test that equal rotations hash the same"""
+        self.assertEqual(hash(Rotation(0.5)), hash(Rotation(0.5)))
+
 
 class TestCoords(unittest.TestCase):
     """Test the Coords class"""
@@ -182,6 +225,12 @@ class TestCoords(unittest.TestCase):
         c2 = Coords(Vector2(3, 4), Rotation(1.2))
         self.assertNotEqual(c1, c2)
 
+    def test_hash(self):
+        """Test that equal coordinates hash the same"""
+        c1 = Coords(Vector2(1, 2), Rotation(0.5))
+        c2 = Coords(Vector2(1, 2), Rotation(0.5))
+        self.assertEqual(hash(c1), hash(c2))
+
     def test_right(self):
         """Test the right method"""
         c1 = Coords(Vector2(1, 2), Rotation(0.5))
@@ -205,5 +254,111 @@ class TestCoords(unittest.TestCase):
         )
 
 
+def random_vectors(count: int):
+    """Returns a list of random non-null vectors"""
+    rng = random.Random(1234)
+    return [Vector2(rng.uniform(-50, 50), rng.uniform(1, 50)) for _ in range(count)]
+
+
+class TestVector2Array(unittest.TestCase):
+    """Test that the Vector2Array class matches Vector2"""
+
+    def assert_matches(self, array: Vector2Array, vectors: list[Vector2]):
+        """Check that an array holds the same vectors as a list"""
+        self.assertEqual(len(array), len(vectors))
+        for got, expected in zip(array.to_vectors(), vectors):
+            self.assertAlmostEqual(got.x, expected.x)
+            self.assertAlmostEqual(got.y, expected.y)
+
+    def setUp(self):
+        self.v1 = random_vectors(20)
+        self.v2 = random_vectors(40)[20:]
+        self.a1 = Vector2Array.from_vectors(self.v1)
+        self.a2 = Vector2Array.from_vectors(self.v2)
+
+    def test_addition(self):
+        """Test the addition operator"""
+        self.assert_matches(
+            self.a1 + self.a2, [a + b for a, b in zip(self.v1, self.v2)]
+        )
+        self.assert_matches(
+            self.a1 + Vector2(1, 2), [a + Vector2(1, 2) for a in self.v1]
+        )
+
+    def test_subtraction(self):
+        """Test the subtraction operator"""
+        self.assert_matches(
+            self.a1 - self.a2, [a - b for a, b in zip(self.v1, self.v2)]
+        )
+
+    def test_multiplication(self):
+        """Test the multiplication operator"""
+        self.assert_matches(
+            self.a1 * self.a2, [a * b for a, b in zip(self.v1, self.v2)]
+        )
+        self.assert_matches(self.a1 * 2.5, [a * 2.5 for a in self.v1])
+        scalars = np.arange(len(self.v1), dtype=float)
+        self.assert_matches(
+            self.a1 * scalars, [a * s for a, s in zip(self.v1, scalars.tolist())]
+        )
+
+    def test_division(self):
+        """Test the division operators"""
+        self.assert_matches(
+            self.a1 / self.a2, [a / b for a, b in zip(self.v1, self.v2)]
+        )
+        self.assert_matches(self.a1 / 3, [a / 3 for a in self.v1])
+        self.assert_matches(
+            self.a1 // self.a2, [a // b for a, b in zip(self.v1, self.v2)]
+        )
+
+    def test_length(self):
+        """Test the length and normalized methods"""
+        for got, vector in zip(self.a1.length().tolist(), self.v1):
+            self.assertAlmostEqual(got, vector.length())
+        self.assert_matches(self.a1.normalized(), [a.normalized() for a in self.v1])
+
+    def test_in_place(self):
+        """Test the in-place operations, including on a slice"""
+        self.a1.iadd(self.a2).imul(2).isub(Vector2(1, 1))
+        self.assert_matches(
+            self.a1, [(a + b) * 2 - Vector2(1, 1) for a, b in zip(self.v1, self.v2)]
+        )
+        self.a2[:5].assign(Vector2(0, 0))
+        self.assert_matches(self.a2, [Vector2(0, 0)] * 5 + self.v2[5:])
+
+    def test_indexing(self):
+        """Test getting and setting single vectors"""
+        self.assertEqual(self.a1[3], self.v1[3])
+        self.a1[3] = Vector2(7, 8)
+        self.assertEqual(self.a1[3], Vector2(7, 8))
+
+
+class TestCoordsArray(unittest.TestCase):
+    """Test that the CoordsArray class matches Coords"""
+
+    def setUp(self):
+        rng = random.Random(5678)
+        self.coords = [
+            Coords(vector, Rotation(rng.uniform(-10, 10)))
+            for vector in random_vectors(20)
+        ]
+        self.array = CoordsArray.from_coords(self.coords)
+
+    def test_directions(self):
+        """Test the forward, backward, right and left methods"""
+        for method in ("forward", "backward", "right", "left"):
+            got = getattr(self.array, method)().to_vectors()
+            for vector, coords in zip(got, self.coords):
+                expected = getattr(coords, method)()
+                self.assertAlmostEqual(vector.x, expected.x)
+                self.assertAlmostEqual(vector.y, expected.y)
+
+    def test_round_trip(self):
+        """Test converting to and from a list of coordinates"""
+        self.assertEqual(self.array.to_coords(), self.coords)
+        self.assertEqual(self.array[4], self.coords[4])
+
+
 if __name__ == "__main__":
     unittest.main()
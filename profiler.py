@@ -0,0 +1,132 @@
+"""
+This module contains the Profiler class, which measures where frame time goes
+with named timing scopes and per-frame counters, and dumps them to a trace
+"""
+
+from collections import deque
+import csv
+import json
+import time
+import numpy as np
+from variables import PROFILER_WINDOW
+
+
+class Scope:
+    """Adds the time spent inside a with block to a timing of the profiler"""
+
+    profiler: "Profiler"
+    name: str
+    start: float
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self.profiler.record(self.name, (time.perf_counter() - self.start) * 1000)
+
+
+class Profiler:
+    """
+    Collects the time spent in named scopes and counters over each frame,
+    keeping the last PROFILER_WINDOW frames for percentiles and traces
+    A scope entered several times in a frame (e.g. once per tick) is summed
+    """
+
+    visible: bool  # Whether the overlay is shown
+    frame: int  # Number of frames ended so far
+    current: dict[str, float]  # Timings (in ms) of the frame in progress
+    counters: dict[str, int]  # Counters of the frame in progress
+    last: dict[str, float]  # Timings of the last ended frame
+    history: deque[dict[str, float]]  # Timings and counters of each recent frame
+    timing_names: dict[str, None]  # Names of the timings seen, as opposed to counters
+    scopes: dict[str, Scope]
+
+    def __init__(self, window: int = PROFILER_WINDOW):
+        self.visible = False
+        self.frame = 0
+        self.current = {}
+        self.counters = {}
+        self.last = {}
+        self.history = deque(maxlen=window)
+        self.timing_names = {}
+        self.scopes = {}
+
+    def reset(self):
+        """Forget every frame recorded so far"""
+        self.frame = 0
+        self.current = {}
+        self.counters = {}
+        self.last = {}
+        self.history.clear()
+        self.timing_names = {}
+
+    def scope(self, name: str) -> Scope:
+        """Returns a context manager timing its block under name"""
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def record(self, name: str, milliseconds: float):
+        """Add time spent in the frame under name"""
+        self.current[name] = self.current.get(name, 0.0) + milliseconds
+
+    def count(self, name: str, value: int):
+        """Set a counter of the frame, e.g. the number of entities drawn"""
+        self.counters[name] = value
+
+    def end_frame(self):
+        """Close the current frame, adding its timings and counters to the history"""
+        self.last = self.current
+        self.timing_names.update(dict.fromkeys(self.current))
+        self.history.append({"frame": self.frame, **self.current, **self.counters})
+        self.current = {}
+        self.counters = {}
+        self.frame += 1
+
+    def percentiles(self, name: str, percents=(50, 95, 99)) -> list[float]:
+        """
+        Returns the given percentiles of a timing or counter over the recent frames,
+        frames where it wasn't recorded counting as 0
+        """
+        values = [frame.get(name, 0.0) for frame in self.history]
+        if not values:
+            return [0.0 for _ in percents]
+        return np.percentile(values, percents).tolist()
+
+    def names(self) -> list[str]:
+        """Returns the name of every timing and counter in the recent frames"""
+        names = {}
+        for frame in self.history:
+            names.update(dict.fromkeys(frame))
+        names.pop("frame", None)
+        return list(names)
+
+    def summary(self) -> dict[str, list[float]]:
+        """Returns the p50, p95 and p99 of every timing and counter"""
+        return {name: self.percentiles(name) for name in self.names()}
+
+    def dump(self, path: str):
+        """Write the recent frames to a trace, as JSON or CSV depending on the extension"""
+        if path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as trace:
+                json.dump(
+                    {"frames": list(self.history), "summary": self.summary()},
+                    trace,
+                    indent=2,
+                )
+            return
+
+        with open(path, "w", encoding="utf-8", newline="") as trace:
+            writer = csv.DictWriter(trace, ["frame"] + self.names(), restval=0)
+            writer.writeheader()
+            writer.writerows(self.history)
+
+
+profiler = Profiler()
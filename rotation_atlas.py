@@ -0,0 +1,50 @@
+"""
+This module contains the RotationAtlas class, which pre-rotates a sprite
+at evenly spaced angles so rendering it only costs a lookup
+"""
+
+import math
+import pygame
+from pos import Rotation
+from variables import ROTATION_STEPS
+
+
+class RotationAtlas:
+    """
+    A sprite pre-rotated at `steps` evenly spaced angles, all packed into one surface
+    Frame i is the sprite rotated by i * 360 / steps degrees
+    """
+
+    steps: int
+    surface: pygame.Surface
+    frames: list[pygame.Surface]
+
+    def __init__(self, sprite: pygame.Surface, steps: int = ROTATION_STEPS):
+        self.steps = steps
+
+        rotated = [
+            pygame.transform.rotate(sprite, i * 360 / steps) for i in range(steps)
+        ]
+        cell_width = max(image.get_width() for image in rotated)
+        cell_height = max(image.get_height() for image in rotated)
+        columns = math.ceil(math.sqrt(steps))
+        rows = math.ceil(steps / columns)
+
+        self.surface = pygame.Surface(
+            (columns * cell_width, rows * cell_height), pygame.SRCALPHA
+        )
+        self.frames = []
+        for i, image in enumerate(rotated):
+            position = ((i % columns) * cell_width, (i // columns) * cell_height)
+            self.surface.blit(image, position)
+            self.frames.append(
+                self.surface.subsurface(pygame.Rect(position, image.get_size()))
+            )
+
+    def index(self, rotation: Rotation) -> int:
+        """Returns the index of the frame closest to the given rotation"""
+        return round(rotation.rotation * self.steps / math.tau) % self.steps
+
+    def get(self, rotation: Rotation) -> pygame.Surface:
+        """Returns the frame closest to the given rotation (shared, do not draw on it)"""
+        return self.frames[self.index(rotation)]
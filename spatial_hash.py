@@ -0,0 +1,106 @@
+"""
+This module contains the SpatialHash class, a uniform grid that indexes
+entities by their position for fast area queries
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator
+import math
+from pos import Vector2
+
+if TYPE_CHECKING:
+    from entity import Entity
+
+
+class SpatialHash:
+    """
+    Uniform grid of square cells, each holding the entities whose position is inside it
+    Adding, moving and removing an entity are O(1)
+    """
+
+    cell_size: float
+    # Dicts are used as insertion-ordered sets, to keep iteration deterministic
+    cells: dict[tuple[int, int], dict[Entity, None]]
+    entity_cells: dict[Entity, tuple[int, int]]
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.entity_cells = {}
+
+    def cell_of(self, pos: Vector2) -> tuple[int, int]:
+        """Returns the cell containing the given position"""
+        return (
+            math.floor(pos.x / self.cell_size),
+            math.floor(pos.y / self.cell_size),
+        )
+
+    def add(self, entity: Entity):
+        """Index an entity at its current position"""
+        cell = self.cell_of(entity.coords.pos)
+        self.entity_cells[entity] = cell
+        self.cells.setdefault(cell, {})[entity] = None
+
+    def remove(self, entity: Entity):
+        """Remove an entity from the index"""
+        cell = self.entity_cells.pop(entity)
+        bucket = self.cells[cell]
+        del bucket[entity]
+        if not bucket:
+            del self.cells[cell]
+
+    def move(self, entity: Entity):
+        """Update the cell of an entity after its position changed"""
+        cell = self.cell_of(entity.coords.pos)
+        if self.entity_cells[entity] != cell:
+            self.remove(entity)
+            self.entity_cells[entity] = cell
+            self.cells.setdefault(cell, {})[entity] = None
+
+    def query_rect(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> Iterator[Entity]:
+        """
+        Yields the entities in every cell overlapping the given rectangle
+        Entities near the edges may be slightly outside of it
+        """
+        min_x, min_y = self.cell_of(Vector2(left, top))
+        max_x, max_y = self.cell_of(Vector2(right, bottom))
+
+        # Walk whichever is smaller: the cells in the rectangle or the occupied cells
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(self.cells):
+            for (x, y), bucket in self.cells.items():
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    yield from bucket
+            return
+
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                bucket = self.cells.get((x, y))
+                if bucket:
+                    yield from bucket
+
+    def query_radius(self, center: Vector2, radius: float) -> list[Entity]:
+        """Returns the entities within radius of center"""
+        radius_squared = radius**2
+        return [
+            entity
+            for entity in self.query_rect(
+                center.x - radius,
+                center.y - radius,
+                center.x + radius,
+                center.y + radius,
+            )
+            if (entity.coords.pos.x - center.x) ** 2
+            + (entity.coords.pos.y - center.y) ** 2
+            <= radius_squared
+        ]
+
+    def __iter__(self) -> Iterator[Entity]:
+        return iter(self.entity_cells)
+
+    def __len__(self):
+        return len(self.entity_cells)
+
+    def __contains__(self, entity: Entity):
+        return entity in self.entity_cells
@@ -0,0 +1,81 @@
+"""Test the spatial_hash module"""
+
+import unittest
+from entity import Entity
+from pos import Coords, Vector2
+from spatial_hash import SpatialHash
+
+
+def entity_at(x: float, y: float):
+    """Returns an entity at the given position"""
+    return Entity(Coords(Vector2(x, y)), Vector2(1, 1))
+
+
+class TestSpatialHash(unittest.TestCase):
+    """Test indexing entities in a grid of cells"""
+
+    def setUp(self):
+        self.grid = SpatialHash(8)
+
+    def test_cell_of(self):
+        """Test that cells are floored, including at negative positions"""
+        self.assertEqual(self.grid.cell_of(Vector2(0, 7.9)), (0, 0))
+        self.assertEqual(self.grid.cell_of(Vector2(8, -0.1)), (1, -1))
+        self.assertEqual(self.grid.cell_of(Vector2(-8, -8.1)), (-1, -2))
+
+    def test_query_radius_across_cells(self):
+        """Test a radius query covering the corner shared by four cells"""
+        inside = [entity_at(x, y) for x in (7.5, 8.5) for y in (7.5, 8.5)]
+        outside = [entity_at(9.9, 9.9), entity_at(2, 8)]
+        for entity in inside + outside:
+            self.grid.add(entity)
+
+        found = self.grid.query_radius(Vector2(8, 8), 1)
+        self.assertCountEqual(found, inside)
+
+    def test_query_rect_across_cells(self):
+        """Test that a rectangle query returns entities from every overlapped cell"""
+        entities = [entity_at(x, y) for x in (-4, 4, 12, 20) for y in (-4, 4, 12)]
+        for entity in entities:
+            self.grid.add(entity)
+
+        found = list(self.grid.query_rect(-1, -1, 9, 9))
+        self.assertCountEqual(
+            found,
+            [
+                entity
+                for entity in entities
+                if entity.coords.pos.x < 16 and entity.coords.pos.y < 16
+            ],
+        )
+
+    def test_query_sparse(self):
+        """Test a rectangle larger than the number of occupied cells"""
+        near, far = entity_at(1000, 1000), entity_at(-1000, 0)
+        self.grid.add(near)
+        self.grid.add(far)
+        self.assertEqual(list(self.grid.query_rect(0, 0, 2000, 2000)), [near])
+
+    def test_move_across_cells(self):
+        """Test that moving an entity to another cell updates the queries"""
+        entity = entity_at(7, 7)
+        self.grid.add(entity)
+        entity.coords.pos = Vector2(9, 7)
+        self.grid.move(entity)
+
+        self.assertEqual(self.grid.query_radius(Vector2(7, 7), 0.5), [])
+        self.assertEqual(self.grid.query_radius(Vector2(9, 7), 0.5), [entity])
+        self.assertEqual(list(self.grid.cells), [(1, 0)])
+
+    def test_remove(self):
+        """Test that removing the last entity of a cell forgets the cell"""
+        entity = entity_at(3, 3)
+        self.grid.add(entity)
+        self.grid.remove(entity)
+        self.assertNotIn(entity, self.grid)
+        self.assertEqual(len(self.grid), 0)
+        self.assertEqual(self.grid.cells, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,68 +3,194 @@ This module contains the StarfieldRenderer class,
 which is used to render a starfield onto a surface
 """
 
+from collections import OrderedDict
+import math
 import random
 import pygame
-from variables import RESOLUTION
+from asset_manager import assets
+from variables import RESOLUTION, PROCEDURAL_STARFIELD, STAR_CELL_CACHE_SIZE
 
 STAR_SIZE_MIN = 2
 STAR_SIZE_MAX = 5
+# Number of stars in a screen-sized area of the procedural starfield
 STAR_COUNT_MIN = 20 * 8
 STAR_COUNT_MAX = 30 * 8
+STAR_CELL_SIZE = 256  # In pixels
+
+# Texture and parallax factor of each layer of the starfield, back to front
+# The parallax factor is how many pixels the layer scrolls when the camera moves one tile
+STARFIELD_LAYERS: list[tuple[str, float]] = [("assets/starfield.png", 1.0)]
+
+
+class StarfieldLayer:
+    """A texture tiled across the whole plane, scrolling with the camera"""
+
+    texture: pygame.Surface
+    parallax: float  # Pixels scrolled when the camera moves one tile
+
+    def __init__(self, path: str, parallax: float, opaque: bool):
+        self.parallax = parallax
+        if opaque:
+            # Nothing is behind the back layer, so its black can be drawn as is
+            self.texture = assets.image(path, "opaque")
+        else:
+            # Copied because the cached texture is shared
+            self.texture = assets.image(path, "opaque").copy()
+            # Black is transparent, run-length encoded to skip it quickly
+            self.texture.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+
+    def visible_blits(self, camera_position: pygame.Vector2, clip: pygame.Rect):
+        """Returns the copies of the texture overlapping clip, as blits"""
+        width = self.texture.get_width()
+        height = self.texture.get_height()
+
+        # The copy at (0, 0) is drawn at the opposite of the camera position,
+        # rounded to whole pixels so that neighbouring copies don't overlap
+        offset_x = math.floor(-camera_position.x * self.parallax)
+        offset_y = math.floor(-camera_position.y * self.parallax)
+
+        # Leftmost and topmost copies overlapping the clip area
+        first_x = offset_x + (clip.left - offset_x) // width * width
+        first_y = offset_y + (clip.top - offset_y) // height * height
+
+        return [
+            (self.texture, (x, y))
+            for y in range(first_y, clip.bottom, height)
+            for x in range(first_x, clip.right, width)
+        ]
+
+
+class ProceduralStarLayer:
+    """
+    An unbounded starfield generated one STAR_CELL_SIZE square cell at a time,
+    each cell's stars only depending on the seed and the cell's position
+    Rendered cells are kept in an LRU cache
+    """
+
+    seed: int
+    parallax: float  # Pixels scrolled when the camera moves one tile
+    opaque: bool  # Whether the cells are drawn with their black background
+    cells: OrderedDict[tuple[int, int], pygame.Surface]
+    cache_size: int
+    generated: int  # Number of cells rendered so far
+
+    def __init__(
+        self,
+        seed: int,
+        parallax: float,
+        opaque: bool,
+        cache_size: int = STAR_CELL_CACHE_SIZE,
+    ):
+        self.seed = seed
+        self.parallax = parallax
+        self.opaque = opaque
+        self.cells = OrderedDict()
+        self.cache_size = cache_size
+        self.generated = 0
+
+    def cell_seed(self, x: int, y: int):
+        """Returns a hash of the seed and the position of a cell"""
+        return (self.seed * 73856093 ^ x * 19349663 ^ y * 83492791) & 0xFFFFFFFF
+
+    def render_cell(self, x: int, y: int):
+        """Returns a new surface with the stars of a cell"""
+        # Use a generator of our own, to leave the global one alone
+        rng = random.Random(self.cell_seed(x, y))
+        # Keep the density of STAR_COUNT_MIN to STAR_COUNT_MAX stars per screen
+        density = STAR_CELL_SIZE**2 / (RESOLUTION[0] * RESOLUTION[1])
+
+        surface = pygame.Surface((STAR_CELL_SIZE, STAR_CELL_SIZE)).convert()
+        for _ in range(round(rng.randint(STAR_COUNT_MIN, STAR_COUNT_MAX) * density)):
+            size = rng.randint(STAR_SIZE_MIN, STAR_SIZE_MAX)
+            brightness = rng.randint(128, 255)
+            pygame.draw.circle(
+                surface,
+                (brightness, brightness, brightness),
+                (
+                    rng.randint(size, STAR_CELL_SIZE - size),
+                    rng.randint(size, STAR_CELL_SIZE - size),
+                ),
+                size / 2,
+            )
+
+        if not self.opaque:
+            surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        self.generated += 1
+        return surface
+
+    def get_cell(self, x: int, y: int):
+        """Returns the rendered stars of a cell, from the cache if possible"""
+        key = (x, y)
+        surface = self.cells.get(key)
+        if surface is not None:
+            self.cells.move_to_end(key)
+            return surface
+
+        surface = self.render_cell(x, y)
+        self.cells[key] = surface
+        if len(self.cells) > self.cache_size:
+            self.cells.popitem(last=False)
+        return surface
+
+    def visible_blits(self, camera_position: pygame.Vector2, clip: pygame.Rect):
+        """Returns the cells overlapping clip, as blits"""
+        offset_x = math.floor(-camera_position.x * self.parallax)
+        offset_y = math.floor(-camera_position.y * self.parallax)
+
+        return [
+            (
+                self.get_cell(x, y),
+                (offset_x + x * STAR_CELL_SIZE, offset_y + y * STAR_CELL_SIZE),
+            )
+            for y in range(
+                (clip.top - offset_y) // STAR_CELL_SIZE,
+                (clip.bottom - 1 - offset_y) // STAR_CELL_SIZE + 1,
+            )
+            for x in range(
+                (clip.left - offset_x) // STAR_CELL_SIZE,
+                (clip.right - 1 - offset_x) // STAR_CELL_SIZE + 1,
+            )
+        ]
 
 
 class StarfieldRenderer:
     """This class is used to render a starfield onto a surface"""
 
     seed: int
-
-    def __init__(self, seed: int):
+    layers: list[StarfieldLayer | ProceduralStarLayer]
+    blits: int  # Blits done by the last render
+
+    def __init__(
+        self,
+        seed: int,
+        layers: list[tuple[str, float]] | None = None,
+        procedural: bool = PROCEDURAL_STARFIELD,
+    ):
+        """
+        layers are (texture, parallax) pairs, back to front
+        If procedural is set, the stars are generated from the seed instead,
+        in one layer for each parallax factor of layers
+        """
         self.seed = seed
-
-        # Generate a star texture that covers the entire screen
-        self.star_texture = pygame.image.load("assets/starfield.png").convert_alpha()
-
-        # Convert black to transparent
-        self.star_texture.set_colorkey((0, 0, 0))
-
-    def render(self, surface: pygame.Surface, camera_position: pygame.Vector2):
-        """Render the starfield onto the surface as a tiled texture from the world center"""
-
-        # camera_position is the center of the screen, and the offset from 0,0
-        # Render the starfield as a tiled texture from the world center
-
-        # One quadrant is a star_texture size block, 0,0 being the quadrant in the center
-        quadrant_x = int(camera_position.x / self.star_texture.get_width())
-        quadrant_y = int(camera_position.y / self.star_texture.get_height())
-
-        # Render the starfield with 8 more starfields around it
-        for x in range(-1, 2):
-            for y in range(-1, 2):
-                surface.blit(
-                    self.star_texture,
-                    (
-                        -camera_position.x
-                        + ((quadrant_x + x) * self.star_texture.get_width()),
-                        -camera_position.y
-                        + ((quadrant_y + y) * self.star_texture.get_height()),
-                    ),
-                )
-
-        random.seed(self.seed)
-
-    def generate_stars(self):
-        """Generate stars based on the camera position"""
-
-        # Seed the random generator
-        random.seed(self.seed)
-
-        # Generate stars
-        for _ in range(100):
-            yield (
-                random.randint(0, RESOLUTION[0]),
-                random.randint(0, RESOLUTION[1]),
-                random.randint(STAR_SIZE_MIN, STAR_SIZE_MAX),
+        self.layers = [
+            (
+                ProceduralStarLayer(seed + i, parallax, i == 0)
+                if procedural
+                else StarfieldLayer(path, parallax, i == 0)
             )
+            for i, (path, parallax) in enumerate(layers if layers else STARFIELD_LAYERS)
+        ]
+        self.blits = 0
 
-        # Unseed the random generator
-        random.seed(None)
+    def render(self, surface: pygame.Surface, camera_position: pygame.Vector2):
+        """
+        Render the starfield onto the surface, as a tiled texture from the world
+        center or as procedural cells, only blitting what overlaps the clip area
+        """
+        clip = surface.get_clip()
+        blits = []
+        for layer in self.layers:
+            blits += layer.visible_blits(camera_position, clip)
+
+        surface.blits(blits, False)
+        self.blits = len(blits)
@@ -27,7 +27,8 @@ class Tile:
     def render(self, _pos: Vector2):
         """
         Returns the image of the rendered tile as a Pygame Surface
-        Tiles with a size larger than 1x1 will be concatenated as a single surface
+        Tiles with a size larger than 1x1 will be concatenated as a single surface,
+        1x1 tiles return a shared sprite which must be copied before drawing on it
         """
         if self.type.size == Vector2(1, 1):
             return self.type.get_sprite(self.surrounding_tiles)
@@ -3,24 +3,83 @@ from __future__ import annotations
 from enum import Enum
 from typing import TYPE_CHECKING, Literal, Type
 import pygame
+from asset_manager import assets
+from chunks import EMPTY_TILE
 from pos import Vector2
-from variables import RESOLUTION
 
 if TYPE_CHECKING:
     from game import Game
 
-pygame.display.set_mode(RESOLUTION)
-pygame.display.init()
+
+OVERWORLD = "assets/Overworld.png"
+
+# Cells (in 16x16 chunks) of the overworld tileset used by each set of sprites
+OVERWORLD_SPRITES: dict[str, list[tuple[int, int]]] = {
+    "grass": [(0, 0)],
+    # In the order of TileType.connected_tiles
+    "grass_water": [
+        (2, 6),
+        (3, 6),
+        (4, 6),
+        (2, 7),
+        (4, 7),
+        (2, 8),
+        (3, 8),
+        (4, 8),
+        (2, 9),
+        (3, 9),
+        (2, 10),
+        (3, 10),
+    ],
+    "grass_earth": [
+        (0, 29),
+        (1, 29),
+        (2, 29),
+        (0, 30),
+        (2, 30),
+        (0, 31),
+        (1, 31),
+        (2, 31),
+        (0, 32),
+        (1, 32),
+        (0, 33),
+        (1, 33),
+    ],
+    "earth": [(1, 30), (2, 32)],
+    "water": [(3, 7)],
+}
 
 
 def overworld_subsurface(x1, y1, x2, y2):
     """Returns a subsurface of the main overworld image (in 16x16 chunks)"""
-    overworld = pygame.image.load("assets/Overworld.png").convert_alpha()
-    return overworld.subsurface(
-        pygame.Rect(x1 * 16, y1 * 16, (x2 - x1) * 16, (y2 - y1) * 16)
+    return assets.subsurface(
+        OVERWORLD,
+        (x1 * 16, y1 * 16, (x2 - x1) * 16, (y2 - y1) * 16),
     )
 
 
+def overworld_sprites(*names: str):
+    """Returns the sprites of the given sets in OVERWORLD_SPRITES, one after another"""
+    return [
+        overworld_subsurface(x, y, x + 1, y + 1)
+        for name in names
+        for x, y in OVERWORLD_SPRITES[name]
+    ]
+
+
+# Offsets of the surrounding tiles passed to get_sprite, clockwise from the top left
+NEIGHBOUR_OFFSETS = [
+    (-1, -1),
+    (0, -1),
+    (1, -1),
+    (1, 0),
+    (1, 1),
+    (0, 1),
+    (-1, 1),
+    (-1, 0),
+]
+
+
 class Align(Enum):
     """The alignment of a set of multiple tiles, i.e. which corner it is rendered from"""
 
@@ -37,6 +96,7 @@ class TileType:
     """
 
     name: str  # In the format "base:stone_wall" for example
+    id: int  # Index in the tile registry, set when registered
     passable: bool
     transparent: bool
     images: list[pygame.surface.Surface]  # Image is chosen at random from these
@@ -45,6 +105,8 @@ class TileType:
     align: Align  # The alignment of the tile, i.e. which corner it is rendered from
     z_index: int  # The z-index of the tile
     connected_tiles: list[pygame.surface.Surface]
+    # Sprite for each neighbour mask, per type of the neighbours bordered
+    border_tables: dict[Type[TileType], list[pygame.surface.Surface]]
 
     def __init__(
         self,
@@ -61,6 +123,7 @@ class TileType:
         self.transparent = transparent
         self.images = images
         self.name = name
+        self.id = EMPTY_TILE
         self.size = size
         self.align = align
         self.z_index = z_index
@@ -72,13 +135,15 @@ class TileType:
         # 8 9
         # 10 11
         self.connected_tiles = connected_tiles if connected_tiles else []
+        self.border_tables = {}
 
     def get_sprite(self, _surrounding_tiles: list[TileType]):
         """
         Allows you to get a sprite based on the surrounding tiles
           surrounding_tiles is a list of 8 tiles, starting from the top left and going clockwise
+        The sprite is shared with other tiles: copy it before drawing on it
         """
-        return self.images[0].copy()
+        return self.images[0]
 
     def __repr__(self):
         return (
@@ -93,8 +158,40 @@ class TileType:
         connected_tiles=None,
     ):
         """Assigns dynamic tile borders based on the surrounding tiles"""
-        tiling = [isinstance(tile, other_type) for tile in surrounding_tiles]
+        return self.border_table(other_type, connected_tiles)[
+            neighbour_mask(surrounding_tiles, other_type)
+        ]
 
+    def border_table(
+        self,
+        other_type: Type[TileType],
+        connected_tiles: list[pygame.surface.Surface] | None = None,
+    ):
+        """
+        Returns the border sprite for each of the 256 masks of neighbours of
+        other_type, built from the pattern rules the first time
+        The connected tiles must always be the same for a given other_type
+        """
+        table = self.border_tables.get(other_type)
+        if table is None:
+            table = [
+                self.match_border(
+                    [bool(mask & 1 << bit) for bit in range(8)], connected_tiles
+                )
+                for mask in range(256)
+            ]
+            self.border_tables[other_type] = table
+        return table
+
+    def match_border(
+        self,
+        tiling: list[bool],
+        connected_tiles: list[pygame.surface.Surface] | None = None,
+    ):
+        """
+        Returns the border sprite matching tiling, which tells for each
+        surrounding tile if it is of the type being bordered
+        """
         connected_tiles = connected_tiles if connected_tiles else self.connected_tiles
 
         if len(connected_tiles) == 0:
@@ -194,63 +291,34 @@ class Grass(TileType):
     def __init__(self):
         super().__init__(
             "base:grass",
-            [overworld_subsurface(0, 0, 1, 1)],
+            overworld_sprites("grass"),
             Vector2(1, 1),
             Align.TOP_LEFT,
             True,
             False,
-            connected_tiles=[
-                # Water
-                overworld_subsurface(2, 6, 3, 7),
-                overworld_subsurface(3, 6, 4, 7),
-                overworld_subsurface(4, 6, 5, 7),
-                overworld_subsurface(2, 7, 3, 8),
-                overworld_subsurface(4, 7, 5, 8),
-                overworld_subsurface(2, 8, 3, 9),
-                overworld_subsurface(3, 8, 4, 9),
-                overworld_subsurface(4, 8, 5, 9),
-                overworld_subsurface(2, 9, 3, 10),
-                overworld_subsurface(3, 9, 4, 10),
-                overworld_subsurface(2, 10, 3, 11),
-                overworld_subsurface(3, 10, 4, 11),
-                # Earth
-                overworld_subsurface(0, 29, 1, 30),
-                overworld_subsurface(1, 29, 2, 30),
-                overworld_subsurface(2, 29, 3, 30),
-                overworld_subsurface(0, 30, 1, 31),
-                overworld_subsurface(2, 30, 3, 31),
-                overworld_subsurface(0, 31, 1, 32),
-                overworld_subsurface(1, 31, 2, 32),
-                overworld_subsurface(2, 31, 3, 32),
-                overworld_subsurface(0, 32, 1, 33),
-                overworld_subsurface(1, 32, 2, 33),
-                overworld_subsurface(0, 33, 1, 34),
-                overworld_subsurface(1, 33, 2, 34),
-            ],
+            # Water borders, then earth borders
+            connected_tiles=overworld_sprites("grass_water", "grass_earth"),
         )
 
     def on_walk(self, game: Game, pos: Vector2):
         print("You walk on grass")
 
     def get_sprite(self, surrounding_tiles: list[TileType]):
-        super().get_sprite(surrounding_tiles)
-
-        if any([isinstance(tile, Water) for tile in surrounding_tiles]):
-            return self.assign_dynamic_tile_borders(
-                "grass_water",
-                Water,
-                surrounding_tiles,
-                connected_tiles=self.connected_tiles[:12],
-            ).copy()
-        elif any([isinstance(tile, Earth) for tile in surrounding_tiles]):
-            return self.assign_dynamic_tile_borders(
-                "earth/grass_earth",
-                Earth,
-                surrounding_tiles,
-                connected_tiles=self.connected_tiles[12:],
-            ).copy()
+        water = 0
+        earth = 0
+        for bit, tile in enumerate(surrounding_tiles):
+            if isinstance(tile, Water):
+                water |= 1 << bit
+            elif isinstance(tile, Earth):
+                earth |= 1 << bit
+
+        # Water borders take priority over earth borders
+        if water:
+            return self.border_table(Water, self.connected_tiles[:12])[water]
+        elif earth:
+            return self.border_table(Earth, self.connected_tiles[12:])[earth]
         else:
-            return self.images[0].copy()
+            return self.images[0]
 
 
 class Earth(TileType):
@@ -259,7 +327,7 @@ class Earth(TileType):
     def __init__(self):
         super().__init__(
             "base:earth",
-            [overworld_subsurface(1, 30, 2, 31), overworld_subsurface(2, 32, 3, 33)],
+            overworld_sprites("earth"),
             Vector2(1, 1),
             Align.TOP_LEFT,
             True,
@@ -270,6 +338,18 @@ class Earth(TileType):
         print("You walk on earth")
 
 
+def neighbour_mask(surrounding_tiles: list[TileType], other_type: Type[TileType]):
+    """
+    Returns the surrounding tiles as an 8-bit mask, where bit i is set if the
+    i-th tile is of other_type
+    """
+    mask = 0
+    for bit, tile in enumerate(surrounding_tiles):
+        if isinstance(tile, other_type):
+            mask |= 1 << bit
+    return mask
+
+
 def matches(x: list[bool | Literal["any"]], tiling: list[bool]):
     """Matches tiling with an array of True, False, any to check if they match"""
     return all([x[i] == tiling[i] or x[i] == "any" for i in range(len(x))])
@@ -286,7 +366,7 @@ class Water(TileType):
     def __init__(self):
         super().__init__(
             "base:water",
-            [overworld_subsurface(3, 7, 4, 8)],
+            overworld_sprites("water"),
             Vector2(1, 1),
             Align.TOP_LEFT,
             False,
@@ -297,8 +377,45 @@ class Water(TileType):
         print("You walk on water")
 
 
-TileRegistry = {
-    "base:grass": Grass,
-    "base:earth": Earth,
-    "base:water": Water,
-}
+class TileTypeRegistry:
+    """
+    Shared instances of every tile type, each identified by a small integer ID
+    Instances are created the first time they are looked up, tiles only store
+    the ID, and ID EMPTY_TILE means there is no tile
+    """
+
+    classes: list[Type[TileType] | None]  # Index is the ID
+    instances: list[TileType | None]
+    ids: dict[str, int]  # ID of each tile type name
+
+    def __init__(self, classes: dict[str, Type[TileType]]):
+        self.classes = [None] + list(classes.values())
+        self.instances = [None] * len(self.classes)
+        self.ids = {name: tile_id for tile_id, name in enumerate(classes, 1)}
+
+    def __getitem__(self, key: int | str) -> TileType | None:
+        """Returns the tile type with the given ID or name"""
+        if key.__class__ is str:
+            key = self.ids[key]
+        tile_type = self.instances[key]
+        if tile_type is None and key != EMPTY_TILE:
+            tile_type = self.classes[key]()
+            tile_type.id = key
+            self.instances[key] = tile_type
+        return tile_type
+
+    def __len__(self):
+        return len(self.classes)
+
+    def types(self) -> list[TileType]:
+        """Returns every tile type, in the order of their IDs"""
+        return [self[tile_id] for tile_id in range(1, len(self.classes))]
+
+
+TileRegistry = TileTypeRegistry(
+    {
+        "base:grass": Grass,
+        "base:earth": Earth,
+        "base:water": Water,
+    }
+)
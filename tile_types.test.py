@@ -0,0 +1,61 @@
+"""Test the tile_types module"""
+
+import itertools
+import unittest
+from engine import engine
+from tile_types import Grass, Earth, Water, neighbour_mask
+
+
+def reference_sprite(grass: Grass, surrounding_tiles):
+    """Sprite of a grass tile, chosen by matching the pattern rules one by one"""
+
+    def borders(other_type, connected_tiles):
+        tiling = [isinstance(tile, other_type) for tile in surrounding_tiles]
+        return grass.match_border(tiling, connected_tiles)
+
+    if any(isinstance(tile, Water) for tile in surrounding_tiles):
+        return borders(Water, grass.connected_tiles[:12])
+    if any(isinstance(tile, Earth) for tile in surrounding_tiles):
+        return borders(Earth, grass.connected_tiles[12:])
+    return grass.images[0]
+
+
+class TestAutotiling(unittest.TestCase):
+    """Test that the lookup tables choose the same sprites as the pattern rules"""
+
+    @classmethod
+    def setUpClass(cls):
+        engine.start(headless=True, preload=False)
+
+    def setUp(self):
+        self.grass = Grass()
+        self.types = [None, Grass(), Earth(), Water()]
+
+    def test_neighbour_mask(self):
+        """Test that bit i of the mask is set for the i-th surrounding tile"""
+        water = Water()
+        surrounding = [water, None, None, water, None, None, None, water]
+        self.assertEqual(neighbour_mask(surrounding, Water), 0b10001001)
+        self.assertEqual(neighbour_mask(surrounding, Earth), 0)
+
+    def test_border_table(self):
+        """Test every mask of a single neighbour type"""
+        water = Water()
+        for mask in range(256):
+            surrounding = [water if mask & 1 << bit else None for bit in range(8)]
+            self.assertIs(
+                self.grass.get_sprite(surrounding),
+                reference_sprite(self.grass, surrounding),
+            )
+
+    def test_mixed_neighbours(self):
+        """Test every combination of surrounding tile types"""
+        for surrounding in itertools.product(self.types, repeat=8):
+            self.assertIs(
+                self.grass.get_sprite(list(surrounding)),
+                reference_sprite(self.grass, surrounding),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 """ This file contains the UI class, which is responsible for rendering the UI """
 from __future__ import annotations
 from typing import TYPE_CHECKING
+import math
 import pygame
 from variables import (
     RESOLUTION,
@@ -10,113 +11,201 @@ from variables import (
     BUTTON_HEIGHT,
     BUTTON_GAP,
 )
+from asset_manager import assets
+from bitmap_font import default_font
 from pos import Vector2
 from entity import Player
-from variables import MAX_PLAYER_VELOCITY
+from profiler import Profiler, profiler
+from variables import (
+    MAX_PLAYER_VELOCITY,
+    OVERLAY_OPACITY_LEVELS,
+    PROFILER_REFRESH,
+)
 
 if TYPE_CHECKING:
     from game import Game
     from level import Level
 
+LINES_FRAME_COUNT = 29
+
 
 class UI:
-    """The UI class, which is responsible for rendering the UI"""
+    """
+    The UI class, which is responsible for rendering the UI
+    Widgets are retained between frames and composited from their cached surfaces
+    """
 
     game: Game
     level: Level
+    health_bar: HealthBar
+    menu: MenuPanel
+    profiler_overlay: ProfilerOverlay
+    profiler_drawn: bool  # Whether the profiler overlay was drawn last frame
+    hud_dirty: bool  # Whether the HUD surface must be composited again
+    overlay_drawn: bool  # Whether the lines overlay was drawn on the HUD last frame
+    # Screen rectangles that changed in the last render, None meaning the whole screen
+    dirty_rects: list[pygame.Rect] | None
+    last_state: GameStates | None
 
     def __init__(self, game: Game, level: Level):
         self.game = game
         self.level = level
         self.surface = pygame.Surface(RESOLUTION, pygame.SRCALPHA)
         self.lines_overlay = LinesOverlay()
+        self.health_bar = HealthBar()
+        self.menu = MenuPanel(game, level)
+        self.profiler_overlay = ProfilerOverlay(profiler)
+        self.profiler_drawn = False
+        self.hud_dirty = True
+        self.overlay_drawn = False
+        self.dirty_rects = None
+        self.last_state = None
 
     def render(self, player: Player):
         """
         Renders the UI
         """
-        self.surface.fill((0, 0, 0, 0))
+        if self.game.state != self.last_state:
+            # Another state's UI was covering the screen
+            self.last_state = self.game.state
+            self.hud_dirty = True
+            self.menu.invalidate()
 
         if self.game.state == GameStates.PLAYING:
-            self.render_health()
-            # Render lines overlay
-            self.lines_overlay.render(self.surface, player.velocity)
+            surface = self.render_hud(player)
         elif self.game.state == GameStates.MENU:
-            self.render_menu()
+            surface = self.render_menu()
+        else:
+            surface = self.surface
+            if self.hud_dirty:
+                self.surface.fill((0, 0, 0, 0))
+                self.hud_dirty = False
+                self.dirty_rects = None
+            else:
+                self.dirty_rects = []
+
+        self.update_profiler_overlay()
+        return surface
+
+    def update_profiler_overlay(self):
+        """
+        Refresh the profiler overlay, which the level draws over the UI surface,
+        redrawing the screen when it changed or was toggled
+        """
+        if profiler.visible:
+            self.profiler_overlay.update()
+        if profiler.visible != self.profiler_drawn or (
+            profiler.visible and self.profiler_overlay.is_dirty()
+        ):
+            self.dirty_rects = None
+        self.profiler_drawn = profiler.visible
+
+    def render_hud(self, player: Player):
+        """Renders the health bar and the lines overlay"""
+        health = 10  # self.level.players["0"]["health"] - 10
+        self.health_bar.set_health(health, 20)
+
+        overlay_visible = self.lines_overlay.opacity(player.velocity) > 0
+
+        # Draw bar to top right of screen with margin
+        margin = 10
+        health_bar_rect = pygame.Rect(
+            RESOLUTION[0] - self.health_bar.width - margin,
+            margin,
+            self.health_bar.width,
+            self.health_bar.height,
+        )
+
+        # The HUD only changes when the health does or while the animated overlay shows
+        if overlay_visible or self.overlay_drawn or self.hud_dirty:
+            self.dirty_rects = None
+        elif self.health_bar.dirty:
+            self.dirty_rects = [health_bar_rect]
+        else:
+            self.dirty_rects = []
+
+        if self.dirty_rects != []:
+            self.surface.fill((0, 0, 0, 0))
+            self.surface.blit(self.health_bar.render(), health_bar_rect)
+            self.hud_dirty = False
+
+        # Render lines overlay
+        self.lines_overlay.render(self.surface, player.velocity)
+        self.overlay_drawn = overlay_visible
         return self.surface
 
     def render_menu(self):
         """Renders the menu"""
-        # Render dark overlay on top of game
-        overlay = pygame.Surface(RESOLUTION, pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 200))
-        self.surface.blit(overlay, (0, 0))
-
-        # Render menu box
-        box_size = (300, 180)
-        box_pos = (
-            RESOLUTION[0] / 2 - box_size[0] / 2,
-            RESOLUTION[1] / 2 - box_size[1] / 2,
-        )
+        self.menu.update_hover(Vector2(*pygame.mouse.get_pos()))
+        # The menu covers the whole screen, so any change to it changes everything
+        self.dirty_rects = None if self.menu.is_dirty() else []
+        return self.menu.render()
 
-        # Brown and pixelated rounded corners box
-        pygame.draw.rect(
-            self.surface,
-            (139, 69, 19),
-            pygame.Rect(box_pos, box_size),
-            border_radius=3,
-        )
 
-        # Render resume, save, quit and load button
-        stack = VButtonStack(
-            [
-                UIButtonRenderer(
-                    "Resume",
-                    self.game.resume,
-                    # gold
-                    bgcolor=(255, 215, 0),
-                    outlinecolor=(0, 0, 0),
-                ),
-                UIButtonRenderer(
-                    "Save",
-                    self.level.save,
-                    bgcolor=(255, 215, 0),
-                    outlinecolor=(0, 0, 0),
-                ),
-                UIButtonRenderer(
-                    "Load",
-                    self.level.load,
-                    bgcolor=(255, 215, 0),
-                    outlinecolor=(0, 0, 0),
-                ),
-                UIButtonRenderer(
-                    "Quit",
-                    self.game.quit,
-                    bgcolor=(255, 215, 0),
-                    outlinecolor=(0, 0, 0),
-                ),
-            ],
-            Vector2(box_pos[0] + box_size[0] / 2, box_pos[1] + box_size[1] / 2),
-        )
+class Widget:
+    """
+    A retained UI element, which keeps its rendered surface between frames and
+    only draws it again after one of its inputs changed and it was invalidated
+    """
 
-        stack_surface = stack.render()
-        self.surface.blit(
-            stack_surface,
-            (
-                box_pos[0] + box_size[0] / 2 - stack_surface.get_width() / 2,
-                box_pos[1] + box_size[1] / 2 - stack_surface.get_height() / 2,
-            ),
-        )
+    surface: pygame.Surface | None
+    dirty: bool
 
-    def render_health(self):
+    def __init__(self):
+        self.surface = None
+        self.dirty = True
+
+    def invalidate(self):
+        """Mark the widget as needing to be drawn again"""
+        self.dirty = True
+
+    def is_dirty(self):
+        """Whether the widget (or one of its children) must be drawn again"""
+        return self.dirty
+
+    def draw(self) -> pygame.Surface:
+        """Draws the widget onto a new surface"""
+        raise NotImplementedError
+
+    def render(self) -> pygame.Surface:
+        """Returns the surface of the widget, drawing it only if it is dirty"""
+        if self.surface is None or self.is_dirty():
+            self.surface = self.draw()
+            self.dirty = False
+        return self.surface
+
+
+class HealthBar(Widget):
+    """A red health bar with a pink outline"""
+
+    health: float
+    max_health: float
+    width: int
+    height: int
+    outline_width: int
+
+    def __init__(self, width: int = 300, height: int = 30, outline_width: int = 3):
+        super().__init__()
+        self.health = 0
+        self.max_health = 1
+        self.width = width
+        self.height = height
+        self.outline_width = outline_width
+
+    def set_health(self, health: float, max_health: float):
+        """Update the displayed health"""
+        if (health, max_health) != (self.health, self.max_health):
+            self.health = health
+            self.max_health = max_health
+            self.invalidate()
+
+    def draw(self):
         """
-        Draws a red health bar with a pink outline in the top right
+        Draws a red health bar with a pink outline
         """
-        health = 10  # self.level.players["0"]["health"] - 10
-        max_health = 20
-        bar_width = 300
-        bar_height = 30
-        outline_width = 3
+        bar_width = self.width
+        bar_height = self.height
+        outline_width = self.outline_width
 
         # Draw health bar
         health_bar = pygame.Surface((bar_width, bar_height), pygame.SRCALPHA)
@@ -140,7 +229,7 @@ class UI:
             pygame.Rect(
                 0,
                 outline_width,
-                (health / max_health) * bar_width,
+                (self.health / self.max_health) * bar_width,
                 bar_height - outline_width * 2,
             ),
             border_radius=3,
@@ -154,81 +243,215 @@ class UI:
             border_radius=3,
         )
 
-        # Draw bar to top right of screen with margin
+        return health_bar
 
-        margin = 10
 
-        self.surface.blit(
-            health_bar,
+class MenuPanel(Widget):
+    """The pause menu: a dark overlay with a box of buttons in the middle"""
+
+    box_size: tuple[int, int]
+    box_pos: tuple[float, float]
+    stack: VButtonStack
+
+    def __init__(self, game: Game, level: Level):
+        super().__init__()
+        self.box_size = (300, 180)
+        self.box_pos = (
+            RESOLUTION[0] / 2 - self.box_size[0] / 2,
+            RESOLUTION[1] / 2 - self.box_size[1] / 2,
+        )
+
+        # Resume, save, quit and load button
+        buttons = [
+            UIButtonRenderer(
+                "Resume",
+                game.resume,
+                # gold
+                bgcolor=(255, 215, 0),
+                outlinecolor=(0, 0, 0),
+            ),
+            UIButtonRenderer(
+                "Save",
+                level.save,
+                bgcolor=(255, 215, 0),
+                outlinecolor=(0, 0, 0),
+            ),
+            UIButtonRenderer(
+                "Load",
+                level.load,
+                bgcolor=(255, 215, 0),
+                outlinecolor=(0, 0, 0),
+            ),
+            UIButtonRenderer(
+                "Quit",
+                game.quit,
+                bgcolor=(255, 215, 0),
+                outlinecolor=(0, 0, 0),
+            ),
+        ]
+        stack_height = (BUTTON_HEIGHT + BUTTON_GAP) * len(buttons)
+        # Centered in the box
+        self.stack = VButtonStack(
+            buttons,
+            Vector2(
+                self.box_pos[0] + self.box_size[0] / 2 - BUTTON_WIDTH / 2,
+                self.box_pos[1] + self.box_size[1] / 2 - stack_height / 2,
+            ),
+        )
+
+    def is_dirty(self):
+        return self.dirty or self.stack.is_dirty()
+
+    def update_hover(self, mouse_pos: Vector2):
+        """Update the hover state of the buttons from the mouse position"""
+        self.stack.update_hover(mouse_pos)
+
+    def draw(self):
+        """Draws the menu"""
+        # Render dark overlay on top of game
+        surface = pygame.Surface(RESOLUTION, pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 200))
+
+        # Brown and pixelated rounded corners box
+        pygame.draw.rect(
+            surface,
+            (139, 69, 19),
+            pygame.Rect(self.box_pos, self.box_size),
+            border_radius=3,
+        )
+
+        surface.blit(self.stack.render(), self.stack.screen_position.to_tuple())
+        return surface
+
+
+class ProfilerOverlay(Widget):
+    """Text panel with the timing percentiles and counters of the profiler"""
+
+    profiler: Profiler
+    drawn_frame: int  # Profiler frame the panel was last drawn at
+
+    def __init__(self, source: Profiler):
+        super().__init__()
+        self.profiler = source
+        self.drawn_frame = -PROFILER_REFRESH
+
+    def update(self):
+        """Invalidate the panel every PROFILER_REFRESH frames"""
+        if self.profiler.frame - self.drawn_frame >= PROFILER_REFRESH:
+            self.invalidate()
+
+    def draw(self):
+        """Draws one line per timing (p50 p95 p99 in ms) and counter (p50)"""
+        lines = [f"frame {self.profiler.frame}    p50 p95 p99"]
+        for name, (p50, p95, p99) in self.profiler.summary().items():
+            if name in self.profiler.timing_names:
+                lines.append(f"{name} {p50:.2f} {p95:.2f} {p99:.2f}")
+            else:
+                lines.append(f"{name} {p50:.0f}")
+
+        font = default_font()
+        line_height = font.height + 2
+        surface = pygame.Surface(
             (
-                RESOLUTION[0] - bar_width - margin,
-                margin,
+                max(font.layout(line, 1)[1] for line in lines) + 8,
+                line_height * len(lines) + 8,
             ),
+            pygame.SRCALPHA,
         )
+        surface.fill((0, 0, 0, 160))
+        for i, line in enumerate(lines):
+            surface.blit(FontRenderer(line, 1).render(), (4, 4 + i * line_height))
 
+        self.drawn_frame = self.profiler.frame
+        return surface
 
-class LinesOverlay:
-    """Renders the lines overlay, covering the screen"""
 
-    sprites: list[pygame.Surface]
+class LinesOverlay:
+    """
+    Renders the lines overlay, covering the screen
+    Opacity is quantized into OVERLAY_OPACITY_LEVELS levels, drawn by setting the
+    frame's surface alpha, which pygame combines with the per-pixel alpha while
+    blitting
+    """
+
+    sprites: list[pygame.Surface | None]  # Each loaded the first time it shows
     frame: int
+    max_opacity: float  # Opacity at full speed
 
     def __init__(self):
         self.frame = 0
-        self.sprites = []
-        for i in range(1, 30):
+        self.sprites = [None] * LINES_FRAME_COUNT
+        self.max_opacity = self.opacity(MAX_PLAYER_VELOCITY)
+
+    def get_sprite(self, frame: int):
+        """
+        Returns a frame of the overlay, scaled to the screen
+        Frames are loaded one at a time as the animation reaches them, so that
+        showing the overlay doesn't stall a single frame on decoding all of them,
+        and cached by the asset manager, so they are only decoded once
+        """
+        sprite = self.sprites[frame]
+        if sprite is None:
             # With leading zeroes, 3 digits
-            self.sprites.append(
-                pygame.transform.scale(
-                    pygame.image.load(f"assets/overlays/lines-{i:03}.png"),
-                    (
-                        RESOLUTION[0],
-                        RESOLUTION[1],
-                    ),
-                )
+            sprite = self.sprites[frame] = assets.image(
+                f"assets/overlays/lines-{frame + 1:03}.png", "alpha", size=RESOLUTION
             )
+        return sprite
 
-    def render(self, surface: pygame.Surface, player_velocity: Vector2):
-        """Render the lines overlay, covering the screen"""
-
-        self.frame += 1
-        if self.frame >= len(self.sprites):
-            self.frame = 0
-
-        # Set sprite opacity to 0.4
-        sprite = self.sprites[self.frame].copy()
-
+    @staticmethod
+    def opacity(player_velocity: float):
+        """Opacity of the lines, 0 or less meaning they are not drawn"""
         # Opacity factors on player velocity
         # The slower the player is going, the more transparent the lines are
-        opacity = (
+        return (
             player_velocity / Vector2(MAX_PLAYER_VELOCITY, MAX_PLAYER_VELOCITY).length()
             - 0.4
         )
 
+    def get_faded(self, frame: int, level: int):
+        """Returns the given frame faded to the given opacity level"""
+        sprite = self.get_sprite(frame)
+        # Only the overlay draws these frames, so their alpha can be set in place
+        sprite.set_alpha(round(level / OVERLAY_OPACITY_LEVELS * self.max_opacity * 255))
+        return sprite
+
+    def render(self, surface: pygame.Surface, player_velocity: float):
+        """Render the lines overlay, covering the screen"""
+
+        self.frame += 1
+        if self.frame >= LINES_FRAME_COUNT:
+            self.frame = 0
+
+        opacity = self.opacity(player_velocity)
+
         if opacity <= 0:
             return
 
-        sprite.fill(
-            (255, 255, 255, opacity * 255), special_flags=pygame.BLEND_RGBA_MULT
+        level = min(
+            math.ceil(opacity / self.max_opacity * OVERLAY_OPACITY_LEVELS),
+            OVERLAY_OPACITY_LEVELS,
         )
-
         surface.blit(
-            sprite,
+            self.get_faded(self.frame, level),
             (0, 0),
         )
 
 
-class VButtonStack:
+class VButtonStack(Widget):
     """Vertical stack of buttons"""
 
     buttons: list[UIButtonRenderer]
-    screen_position: Vector2
+    screen_position: Vector2  # Top left corner of the stack on the screen
 
     def __init__(self, buttons: list[UIButtonRenderer], screen_position: Vector2):
+        super().__init__()
         self.buttons = buttons
         self.screen_position = screen_position
 
-    def render(self):
+    def is_dirty(self):
+        return self.dirty or any(button.is_dirty() for button in self.buttons)
+
+    def draw(self):
         """Renders the buttons"""
         surface = pygame.Surface(
             (BUTTON_WIDTH, (BUTTON_HEIGHT + BUTTON_GAP) * len(self.buttons)),
@@ -245,27 +468,39 @@ class VButtonStack:
             )
         return surface
 
+    def button_at(self, mouse_pos: Vector2):
+        """Returns the button under the given screen position, if any"""
+        for i, button in enumerate(self.buttons):
+            if (
+                mouse_pos.x > self.screen_position.x
+                and mouse_pos.x < self.screen_position.x + BUTTON_WIDTH
+                and mouse_pos.y
+                > self.screen_position.y + i * (BUTTON_HEIGHT + BUTTON_GAP)
+                and mouse_pos.y
+                < self.screen_position.y
+                + i * (BUTTON_HEIGHT + BUTTON_GAP)
+                + BUTTON_HEIGHT
+            ):
+                return button
+        return None
+
+    def update_hover(self, mouse_pos: Vector2):
+        """Set the hover state of every button from the mouse position"""
+        hovered = self.button_at(mouse_pos)
+        for button in self.buttons:
+            button.on_hover(button is hovered)
+
     def tick(self):
         """Called every frame, at 60 frames a second"""
         # Check if is being clicked
         # If so, call the onclick function
         if pygame.mouse.get_pressed()[0]:
-            mouse_pos = Vector2(*pygame.mouse.get_pos())
-            for i, button in enumerate(self.buttons):
-                if (
-                    mouse_pos.x > self.screen_position.x
-                    and mouse_pos.x < self.screen_position.x + BUTTON_WIDTH
-                    and mouse_pos.y
-                    > self.screen_position.y + i * (BUTTON_HEIGHT + BUTTON_GAP)
-                    and mouse_pos.y
-                    < self.screen_position.y
-                    + i * (BUTTON_HEIGHT + BUTTON_GAP)
-                    + BUTTON_HEIGHT
-                ):
-                    button.on_click()
-
-
-class UIButtonRenderer:
+            button = self.button_at(Vector2(*pygame.mouse.get_pos()))
+            if button is not None:
+                button.on_click()
+
+
+class UIButtonRenderer(Widget):
     """Renders a button"""
 
     text: str
@@ -281,14 +516,20 @@ class UIButtonRenderer:
         bgcolor: pygame.color.Color = pygame.color.Color("black"),
         outlinecolor: pygame.color.Color = pygame.color.Color("white"),
     ):
+        super().__init__()
         self.text = text
         self.onclick = onclick
         self.bgcolor = bgcolor
         self.outlinecolor = outlinecolor
-        # TODO: Add hover effect
         self.is_hovered = False
 
-    def render(self):
+    def set_text(self, text: str):
+        """Change the label of the button"""
+        if text != self.text:
+            self.text = text
+            self.invalidate()
+
+    def draw(self):
         """Returns a surface with the rendered button"""
         surface = pygame.Surface((BUTTON_WIDTH, BUTTON_HEIGHT), pygame.SRCALPHA)
 
@@ -340,7 +581,10 @@ class UIButtonRenderer:
         return surface
 
     def on_hover(self, is_hovered):
-        self.is_hovered = is_hovered
+        """Called when the mouse enters or leaves the button"""
+        if is_hovered != self.is_hovered:
+            self.is_hovered = is_hovered
+            self.invalidate()
 
     def on_click(self):
         """Called when the button is clicked"""
@@ -351,46 +595,22 @@ class FontRenderer:
     """Renders font using the font sprites"""
 
     text: str
+    zoom: float
+    color: tuple[int, int, int] | None
 
-    def __init__(self, text: str):
+    def __init__(
+        self,
+        text: str,
+        zoom: float = UI_ZOOM,
+        color: tuple[int, int, int] | None = None,
+    ):
         self.text = text
+        self.zoom = zoom
+        self.color = color
 
     def render(self):
-        """Returns a surface with the rendered text"""
-        allowed_characters = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKL\
-            MNOPQRSTUVWXYZ0123456789$+%#&)(.!,_/) "
-
-        text = self.text.lower()
-
-        surface = pygame.Surface(RESOLUTION, pygame.SRCALPHA)
-
-        # Render each character of text with kerning -1 and UI_ZOOM applied onto the surface
-        # Font is NOT monospace
-        # Spaces are just 4-pixel spaces and not a character
-        # Font height is 8
-
-        x = 0
-        y = 0
-
-        for char in text:
-            if char not in allowed_characters:
-                continue
-            if char == " ":
-                x += 4 * UI_ZOOM
-                continue
-            char_surface = pygame.image.load(f"assets/font/font_{char}.png")
-            surface.blit(char_surface, (x, y))
-            x += char_surface.get_width() - 1
-
-        x += 1
-
-        # Crop surface to text
-        surface = surface.subsurface(pygame.Rect(0, 0, x, 8))
-
-        # Scale surface by UI_ZOOM
-        surface = pygame.transform.scale(
-            surface,
-            (int(surface.get_width() * UI_ZOOM), int(surface.get_height() * UI_ZOOM)),
-        )
-
-        return surface
+        """
+        Returns a surface with the rendered text
+        The surface is cached and shared, so it must not be drawn on
+        """
+        return default_font().render(self.text, self.zoom, self.color)
@@ -12,6 +12,61 @@ BUTTON_HEIGHT = 50
 BUTTON_GAP = 4
 
 MAX_PLAYER_VELOCITY = 6
+# Velocity gained per second of throttle
+PLAYER_ACCELERATION = 20
+# Degrees turned per second
+PLAYER_TURN_SPEED = 200
+# Seconds between two shots
+SHOOT_COOLDOWN = 0.15
+
+# Simulation ticks per second, independent of the render frame rate
+TICK_RATE = 60
+TICK_DURATION = 1 / TICK_RATE
+# Frame rate cap for rendering
+MAX_FPS = 60
+# Longest frame (in seconds) the simulation will catch up on, to avoid a spiral of death
+MAX_FRAME_TIME = 0.25
+
+# Size (in tiles) of the cells of the entity spatial index
+SPATIAL_CELL_SIZE = 8
+
+# Distance (in pixels) from an entity's center to the edge of its largest
+# rotated sprite, used to keep entities drawn until they are fully off screen
+CULL_MARGIN = 32
+
+# Only push the changed parts of the screen to the display, instead of the full frame
+DIRTY_RECTS = False
+# Above this many changed rectangles, a frame is treated as fully changed
+MAX_DIRTY_RECTS = 64
+
+# Width and height (in tiles) of the chunks the tile map is stored in
+CHUNK_SIZE = 32
+# Chunks within this distance (in chunks) of the camera are kept loaded
+CHUNK_LOAD_RADIUS = 2
+# Chunks further than this are evicted, larger than CHUNK_LOAD_RADIUS so that
+# moving back and forth across a chunk border doesn't reload chunks
+CHUNK_UNLOAD_RADIUS = 3
+
+# Number of opacity steps of the speed lines overlay
+OVERLAY_OPACITY_LEVELS = 8
+
+# Number of rendered strings kept by the bitmap font
+TEXT_CACHE_SIZE = 128
+
+# Generate the starfield procedurally instead of tiling the starfield texture
+PROCEDURAL_STARFIELD = False
+# Number of rendered cells of the procedural starfield kept in memory
+STAR_CELL_CACHE_SIZE = 48
+
+# Number of pre-rotated frames baked for each rotating sprite
+ROTATION_STEPS = 128
+
+# Number of recent frames the profiler keeps for percentiles and traces
+PROFILER_WINDOW = 600
+# Frames between two refreshes of the profiler overlay
+PROFILER_REFRESH = 30
+# File the profiler trace is dumped to, as JSON or CSV depending on the extension
+PROFILER_TRACE = "profile.json"
 
 
 class GameStates(Enum):